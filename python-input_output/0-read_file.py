@@ -4,7 +4,10 @@ Module to read and print the content of a UTF-8 text file.
 """
 
 
-def read_file(filename=""):
-    """Print the content of a UTF-8 text file."""
+def read_file(filename="", chunk_size=65536):
+    """Print the content of a UTF-8 text file, one chunk at a time."""
     with open(filename, "r", encoding="utf-8") as f:
-        print(f.read(), end="")
+        chunk = f.read(chunk_size)
+        while chunk:
+            print(chunk, end="")
+            chunk = f.read(chunk_size)
@@ -8,3 +8,26 @@ def write_file(filename="", text=""):
     """Write a string to a UTF8 file and return numberof characters written."""
     with open(filename, "w", encoding="utf-8") as f:
         return f.write(text)
+
+
+def write_file_batch(filename="", texts=(), batch_size=65536):
+    """Write an iterable of strings to a UTF-8 file in batches.
+
+    Strings are joined into batches of about batch_size characters so that
+    many small strings cost one write call per batch. Return the number of
+    characters written.
+    """
+    written = 0
+    batch = []
+    size = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        for text in texts:
+            batch.append(text)
+            size += len(text)
+            if size >= batch_size:
+                written += f.write("".join(batch))
+                batch = []
+                size = 0
+        if batch:
+            written += f.write("".join(batch))
+    return written
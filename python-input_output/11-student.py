@@ -1,6 +1,41 @@
 #!/usr/bin/python3
 """Define a Student class with JSON serialization and deserialization."""
 
+import json
+
+_FIELDS = ('first_name', 'last_name', 'age')
+
+
+def _compile_projection(attrs):
+    """Generate a function returning the to_json(attrs) dict of a Student.
+
+    The selected keys are written out as a dict literal once, in the order
+    __init__ sets them, so projecting a student costs a few dict lookups.
+    Students whose attributes are not exactly first_name, last_name and
+    age (e.g. after reload_from_json added others) fall back to the
+    generic filter, so keys always come in __dict__ order.
+    """
+    wanted = frozenset(a for a in attrs if isinstance(a, str))
+    keys = [k for k in _FIELDS if k in wanted]
+    body = ", ".join("{0!r}: d[{0!r}]".format(k) for k in keys)
+    # The selected fields raise KeyError when missing; check the others
+    guard = " and ".join(["len(d) == {0}".format(len(_FIELDS))] +
+                         ["{0!r} in d".format(k)
+                          for k in _FIELDS if k not in wanted])
+    source = (
+        "def project(student):\n"
+        "    d = student.__dict__\n"
+        "    if " + guard + ":\n"
+        "        try:\n"
+        "            return {" + body + "}\n"
+        "        except KeyError:\n"
+        "            pass\n"
+        "    return {k: v for k, v in d.items() if k in wanted}\n"
+    )
+    namespace = {"wanted": wanted}
+    exec(source, namespace)
+    return namespace["project"]
+
 
 class Student:
     """Student class with first_name, last_name, and age attributes."""
@@ -14,9 +49,46 @@ class Student:
     def to_json(self, attrs=None):
         """Return dictionary of instance attributes filter by attrs if given"""
         if isinstance(attrs, list):
-            return {k: v for k, v in self.__dict__.items() if k in attrs}
+            wanted = frozenset(a for a in attrs if isinstance(a, str))
+            return {k: v for k, v in self.__dict__.items() if k in wanted}
         return self.__dict__.copy()
 
+    @staticmethod
+    def projection(attrs=None):
+        """Compile attrs once into a function equivalent to to_json(attrs)"""
+        if isinstance(attrs, list):
+            return _compile_projection(attrs)
+        return lambda student: student.__dict__.copy()
+
+    @staticmethod
+    def to_json_many(students, attrs=None):
+        """Return the to_json(attrs) dictionaries of many students"""
+        return list(map(Student.projection(attrs), students))
+
+    @staticmethod
+    def dump_json_many(students, f, attrs=None, chunk_size=1000):
+        """Write the to_json(attrs) dictionaries of students as a JSON list.
+
+        Students are projected and encoded chunk by chunk, so the output
+        matches json.dump(Student.to_json_many(...), f) without building
+        the whole list.
+        """
+        project = Student.projection(attrs)
+        encode = json.JSONEncoder().encode
+        chunk = []
+        separator = "["
+        for student in students:
+            chunk.append(project(student))
+            if len(chunk) == chunk_size:
+                # Encode the whole chunk in one call and drop its brackets
+                f.write(separator + encode(chunk)[1:-1])
+                separator = ", "
+                chunk = []
+        if chunk:
+            f.write(separator + encode(chunk)[1:-1])
+            separator = ", "
+        f.write("[]" if separator == "[" else "]")
+
     def reload_from_json(self, json):
         """Replace all attributes of the instance using a dictionary."""
         for key, value in json.items():
@@ -1,20 +1,109 @@
 #!/usr/bin/python3
 """Return a list of lists representing Pascal's triangle of n rows."""
 
+from array import array
+from math import comb
+from operator import add
+
+# Rows kept for later calls, keyed by (row index, modulus), oldest first
+_row_cache = {}
+CACHE_SIZE = 32
+
+# Beyond this many rows, computing a row directly beats extending from
+# the nearest cached row
+EXTEND_LIMIT = 16
+
+
+def _next_row(row, mod=None):
+    """Return the row following row, reduced modulo mod if given."""
+    middle = map(add, row[:-1], row[1:])
+    if mod:
+        middle = (x % mod for x in middle)
+    return [1 % mod if mod else 1, *middle, 1 % mod if mod else 1]
+
+
+def _remember(k, mod, row):
+    """Store row k in the cache, evicting the least recently used row."""
+    key = (k, mod)
+    _row_cache.pop(key, None)
+    _row_cache[key] = tuple(row)
+    while len(_row_cache) > CACHE_SIZE:
+        del _row_cache[next(iter(_row_cache))]
+
+
+def _nearest_cached(k, mod):
+    """Return (j, row) for the highest cached row j <= k, or (None, None)."""
+    best = None
+    for j, row_mod in _row_cache:
+        if row_mod == mod and j <= k and (best is None or j > best):
+            best = j
+    if best is None:
+        return None, None
+    # Mark the row as recently used
+    row = _row_cache.pop((best, mod))
+    _row_cache[(best, mod)] = row
+    return best, list(row)
+
+
+def _convert(row, typecode=None, dtype=None):
+    """Return row as a list, an array of typecode, or a NumPy array."""
+    if dtype is not None:
+        import numpy
+        return numpy.array(row, dtype=dtype)
+    if typecode is not None:
+        return array(typecode, row)
+    return row
+
+
+def binomial(n, k, mod=None):
+    """Return the coefficient k of row n, modulo mod if given."""
+    if not 0 <= k <= n:
+        return 0
+    return comb(n, k) % mod if mod else comb(n, k)
+
+
+def pascal_row(k, mod=None, typecode=None, dtype=None):
+    """Return row k (counting from 0) of Pascal's triangle.
+
+    The row is extended from a nearby cached row when one exists, and
+    otherwise computed directly with multiplicative binomials. With mod,
+    coefficients are reduced modulo mod; typecode returns an array.array
+    and dtype a NumPy array, which keeps large rows compact.
+    """
+    if k < 0:
+        return _convert([], typecode, dtype)
+    j, row = _nearest_cached(k, mod)
+    if row is None or k - j > EXTEND_LIMIT:
+        row = [1]
+        for i in range(k):
+            row.append(row[i] * (k - i) // (i + 1))
+        if mod:
+            row = [x % mod for x in row]
+        j = k
+    while j < k:
+        row = _next_row(row, mod)
+        j += 1
+    _remember(k, mod, row)
+    return _convert(row, typecode, dtype)
+
+
+def pascal_rows(n, mod=None, typecode=None, dtype=None):
+    """Yield the first n rows of Pascal's triangle one at a time.
+
+    Only the current row is held in memory. The last row reached is
+    cached so that a later pascal_row call can extend from it.
+    """
+    row = None
+    for i in range(n):
+        row = [1 % mod if mod else 1] if row is None else _next_row(row, mod)
+        yield _convert(row, typecode, dtype)
+    if row is not None:
+        _remember(n - 1, mod, row)
+
 
 def pascal_triangle(n):
     """Generate Pascal's triangle of n rows as a list of lists."""
     if n <= 0:
         return []
 
-    triangle = [[1]]  # first row
-
-    for i in range(1, n):
-        prev_row = triangle[i - 1]
-        row = [1]  # first element
-        for j in range(1, i):
-            row.append(prev_row[j - 1] + prev_row[j])  # sum of two above
-        row.append(1)  # last element
-        triangle.append(row)
-
-    return triangle
+    return list(pascal_rows(n))
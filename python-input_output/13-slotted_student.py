@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+"""Define compact Student record types for holding many students at once."""
+
+from array import array
+
+
+class SlottedStudent:
+    """Student stored in __slots__ instead of a per-instance __dict__."""
+
+    __slots__ = ('first_name', 'last_name', 'age')
+
+    def __init__(self, first_name, last_name, age):
+        """Initialize a Student with first_name, last_name, and age."""
+        self.first_name = first_name
+        self.last_name = last_name
+        self.age = age
+
+    def to_json(self, attrs=None):
+        """Return dictionary of instance attributes filter by attrs if given"""
+        if isinstance(attrs, list):
+            return {k: getattr(self, k) for k in self.__slots__ if k in attrs}
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def reload_from_json(self, json):
+        """Replace attributes of the instance using a dictionary.
+
+        Only first_name, last_name and age can be set; other keys raise
+        AttributeError.
+        """
+        for key, value in json.items():
+            setattr(self, key, value)
+
+    def __reduce__(self):
+        """Pickle the instance as a constructor call."""
+        return (self.__class__, (self.first_name, self.last_name, self.age))
+
+
+class FrozenStudent(SlottedStudent):
+    """Immutable, hashable SlottedStudent."""
+
+    __slots__ = ()
+
+    def __init__(self, first_name, last_name, age):
+        """Initialize a Student with first_name, last_name, and age."""
+        object.__setattr__(self, 'first_name', first_name)
+        object.__setattr__(self, 'last_name', last_name)
+        object.__setattr__(self, 'age', age)
+
+    def __setattr__(self, name, value):
+        """Refuse to modify the instance, including via reload_from_json."""
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, name):
+        """Refuse to modify the instance."""
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __eq__(self, other):
+        """Compare two frozen students by value."""
+        if not isinstance(other, FrozenStudent):
+            return NotImplemented
+        return ((self.first_name, self.last_name, self.age) ==
+                (other.first_name, other.last_name, other.age))
+
+    def __hash__(self):
+        """Hash the student by value."""
+        return hash((self.first_name, self.last_name, self.age))
+
+
+class StudentBatch:
+    """Columnar container storing each Student field in its own array.
+
+    Names are kept in lists and ages in a signed 64-bit array, so a batch
+    costs a few pointers and one machine integer per student instead of a
+    full object. Ages must therefore be integers.
+    """
+
+    fields = ('first_name', 'last_name', 'age')
+
+    def __init__(self, students=()):
+        """Initialize a batch, optionally from an iterable of students."""
+        self.first_name = []
+        self.last_name = []
+        self.age = array('q')
+        self.extend(students)
+
+    def append(self, first_name, last_name, age):
+        """Add one student given its fields."""
+        self.age.append(age)
+        self.first_name.append(first_name)
+        self.last_name.append(last_name)
+
+    def extend(self, students):
+        """Add students from any objects with the Student attributes."""
+        for student in students:
+            self.append(student.first_name, student.last_name, student.age)
+
+    def __len__(self):
+        """Return the number of students in the batch."""
+        return len(self.age)
+
+    def __getitem__(self, i):
+        """Return the student at position i as a SlottedStudent."""
+        return SlottedStudent(self.first_name[i], self.last_name[i],
+                              self.age[i])
+
+    def __iter__(self):
+        """Yield every student as a SlottedStudent."""
+        for row in zip(self.first_name, self.last_name, self.age):
+            yield SlottedStudent(*row)
+
+    def to_json(self, i, attrs=None):
+        """Return the dictionary of student i filtered by attrs if given."""
+        if isinstance(attrs, list):
+            return {k: getattr(self, k)[i] for k in self.fields if k in attrs}
+        return {k: getattr(self, k)[i] for k in self.fields}
+
+    def to_json_many(self, attrs=None):
+        """Return the dictionaries of all students filtered by attrs."""
+        keys = [k for k in self.fields
+                if not isinstance(attrs, list) or k in attrs]
+        if not keys:
+            return [{} for _ in range(len(self))]
+        columns = [getattr(self, k) for k in keys]
+        return [dict(zip(keys, row)) for row in zip(*columns)]
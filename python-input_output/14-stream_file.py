@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+"""
+Module for streaming UTF-8 files without loading them into memory.
+"""
+
+import codecs
+import io
+import mmap
+import os
+import shutil
+import sys
+from array import array
+
+
+def copy_file(filename="", chunk_size=65536, validate=True):
+    """Copy a UTF-8 file to stdout in binary chunks; return bytes copied.
+
+    With validate, each chunk is checked by an incremental UTF-8 decoder
+    before it is written, and UnicodeDecodeError is raised on invalid
+    input. Without it, the copy is done by os.sendfile where the platform
+    allows, falling back to shutil.copyfileobj. Unlike read_file, line
+    endings are copied unchanged. If stdout has no binary buffer, the file
+    is decoded and written as text instead.
+    """
+    sys.stdout.flush()
+    out = getattr(sys.stdout, "buffer", None)
+    with open(filename, "rb") as f:
+        if out is None:
+            # stdout was replaced by a text-only stream: decode instead
+            text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+            shutil.copyfileobj(text, sys.stdout, chunk_size)
+            return f.tell()
+        if not validate:
+            try:
+                return _sendfile(f, out)
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                f.seek(0)
+                shutil.copyfileobj(f, out, chunk_size)
+                out.flush()
+                return f.tell()
+
+        decode = codecs.getincrementaldecoder("utf-8")().decode
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        copied = 0
+        n = f.readinto(buf)
+        while n:
+            decode(view[:n])
+            out.write(view[:n])
+            copied += n
+            n = f.readinto(buf)
+        decode(b"", True)
+        out.flush()
+        return copied
+
+
+def _sendfile(f, out):
+    """Copy f to the file descriptor behind out with os.sendfile."""
+    out.flush()
+    out_fd = out.fileno()
+    size = os.fstat(f.fileno()).st_size
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(out_fd, f.fileno(), offset, size - offset)
+        if sent == 0:
+            break
+        offset += sent
+    return offset
+
+
+class MappedLines:
+    """Random access to the lines of a UTF-8 file through a memory map.
+
+    Line offsets are found with a single scan on first use; lines are
+    decoded only when accessed and keep their line ending, as when
+    iterating over a file.
+    """
+
+    def __init__(self, filename=""):
+        """Map filename read-only."""
+        with open(filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._map = b""
+        self._starts = None
+
+    def __enter__(self):
+        """Return the mapped file for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc):
+        """Unmap the file when leaving a with statement."""
+        self.close()
+
+    def close(self):
+        """Unmap the file."""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+    def _index(self):
+        """Return the start offset of every line, scanning once."""
+        if self._starts is None:
+            starts = array("Q")
+            find = self._map.find
+            size = len(self._map)
+            pos = 0
+            while pos < size:
+                starts.append(pos)
+                end = find(b"\n", pos)
+                pos = size if end < 0 else end + 1
+            starts.append(size)
+            self._starts = starts
+        return self._starts
+
+    def __len__(self):
+        """Return the number of lines."""
+        return len(self._index()) - 1
+
+    def __getitem__(self, i):
+        """Return line i, decoded from UTF-8."""
+        starts = self._index()
+        if i < 0:
+            i += len(starts) - 1
+        if not 0 <= i < len(starts) - 1:
+            raise IndexError("line index out of range")
+        return self._map[starts[i]:starts[i + 1]].decode("utf-8")
+
+    def __iter__(self):
+        """Yield lines in order without building the full index."""
+        find = self._map.find
+        size = len(self._map)
+        pos = 0
+        while pos < size:
+            end = find(b"\n", pos)
+            end = size if end < 0 else end + 1
+            yield self._map[pos:end].decode("utf-8")
+            pos = end
@@ -8,3 +8,26 @@ def append_write(filename="", text=""):
     """Append text to a UTF-8 file and return number of chars added."""
     with open(filename, "a", encoding="utf-8") as f:
         return f.write(text)
+
+
+def append_write_batch(filename="", texts=(), batch_size=65536):
+    """Append an iterable of strings to a UTF-8 file in batches.
+
+    Strings are joined into batches of about batch_size characters so that
+    many small strings cost one write call per batch. Return the number of
+    characters added.
+    """
+    added = 0
+    batch = []
+    size = 0
+    with open(filename, "a", encoding="utf-8") as f:
+        for text in texts:
+            batch.append(text)
+            size += len(text)
+            if size >= batch_size:
+                added += f.write("".join(batch))
+                batch = []
+                size = 0
+        if batch:
+            added += f.write("".join(batch))
+    return added
@@ -1,18 +1,152 @@
 #!/usr/bin/python3
 """
 Script that adds all command-line arguments to a JSON list file.
+
+By default the list in add_item.json is rewritten on every run, through a
+temporary file and an atomic rename. With ADD_ITEM_MODE=log in the
+environment, arguments are instead appended as JSON Lines to
+add_item.json.log in O(1); the log is folded back into add_item.json once
+it grows past ADD_ITEM_COMPACT_BYTES (1 MiB by default) and on the next
+default-mode run. An advisory lock on the directory serializes concurrent
+invocations.
+
+A run that crashes while appending leaves an incomplete last line, which
+is cut off before the log is written to again. Folding the log marks it
+with the checksum of the new add_item.json first, so if a crash leaves
+the log entries in both files, they are only counted once.
 """
 
+import contextlib
+import json
+import os
 import sys
+import zlib
 save_to_json_file = __import__('5-save_to_json_file').save_to_json_file
 load_from_json_file = __import__('6-load_from_json_file').load_from_json_file
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 filename = "add_item.json"
+log_filename = filename + ".log"
+
+
+@contextlib.contextmanager
+def locked():
+    """Hold an exclusive advisory lock on the directory of the list file,
+    where supported."""
+    if not fcntl:
+        yield
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def checksum(path):
+    """Return the CRC-32 of a file's contents, or None if it is missing."""
+    try:
+        with open(path, "rb") as f:
+            return zlib.crc32(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def complete_length(log):
+    """Return the length of the complete lines at the start of a log."""
+    end = log.seek(0, os.SEEK_END)
+    while end > 0:
+        size = min(end, 1 << 16)
+        log.seek(end - size)
+        newline = log.read(size).rfind(b"\n")
+        if newline >= 0:
+            return end - size + newline + 1
+        end -= size
+    return 0
+
+
+def load_items(log=None):
+    """Return the items in the JSON list file followed by those in the log.
+
+    An incomplete last line of the log is ignored, but any other line that
+    is not valid JSON raises ValueError. Entries followed by the marker of
+    a compaction that wrote the current list file are already in it.
+    """
+    try:
+        my_list = load_from_json_file(filename)
+    except FileNotFoundError:
+        my_list = []
+    if log is None:
+        return my_list
+    logged = []
+    log.seek(0)
+    for number, line in enumerate(log, 1):
+        if not line.endswith(b"\n"):
+            break
+        try:
+            item = json.loads(line)
+        except ValueError:
+            raise ValueError("{}: line {} is corrupt".format(
+                log_filename, number)) from None
+        # Items are strings, so an object is a compaction marker
+        if isinstance(item, dict):
+            if item.get("compacted") == checksum(filename):
+                logged = []
+        else:
+            logged.append(item)
+    return my_list + logged
+
+
+def compact(my_list, log=None):
+    """Atomically replace the JSON list file and empty the log."""
+    tmp_filename = filename + ".tmp"
+    save_to_json_file(my_list, tmp_filename)
+    with open(tmp_filename, "rb") as f:
+        crc = zlib.crc32(f.read())
+        os.fsync(f.fileno())
+    if log is not None:
+        log.seek(0, os.SEEK_END)
+        log.write(json.dumps({"compacted": crc}).encode("utf-8") + b"\n")
+        log.flush()
+        os.fsync(log.fileno())
+    os.replace(tmp_filename, filename)
+    if log is not None:
+        log.truncate(0)
+
+
+def main(args):
+    """Add args to the list, either directly or through the append log."""
+    log_mode = os.environ.get("ADD_ITEM_MODE") == "log"
+    with locked():
+        if log_mode:
+            log = open(log_filename, "a+b")
+        else:
+            try:
+                log = open(log_filename, "r+b")
+            except FileNotFoundError:
+                log = None
+        with log if log is not None else contextlib.nullcontext():
+            if log is not None:
+                # Cut off a line left incomplete by a crashed run
+                log.truncate(complete_length(log))
+            if log_mode:
+                log.write("".join(json.dumps(arg) + "\n"
+                                  for arg in args).encode("utf-8"))
+                log.flush()
+                limit = int(os.environ.get("ADD_ITEM_COMPACT_BYTES",
+                                           1 << 20))
+                if log.tell() < limit:
+                    return
+                args = []
+            my_list = load_items(log)
+            my_list.extend(args)
+            compact(my_list, log)
 
-try:
-    my_list = load_from_json_file(filename)
-except FileNotFoundError:
-    my_list = []
 
-my_list.extend(sys.argv[1:])
-save_to_json_file(my_list, filename)
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+"""Benchmark projecting and serializing students with to_json(attrs).
+
+Compares the per-call to_json loop, as it was before projections, with
+Student.to_json_many, and json.dump of that loop's list with
+Student.dump_json_many.
+
+Usage: ./bench_student_json.py [count]
+"""
+
+import io
+import json
+import sys
+import time
+
+Student = __import__('11-student').Student
+ATTRS = ['first_name', 'last_name', 'age']
+
+
+def old_to_json(student, attrs):
+    """to_json(attrs) as it was: membership tested against the list."""
+    return {k: v for k, v in student.__dict__.items() if k in attrs}
+
+
+def timed(func):
+    """Return the best time of three calls of func."""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(count):
+    """Print the time of each way and the speed-up of the new one."""
+    students = [Student("John", "Doe", i) for i in range(count)]
+    runs = (
+        ("projection",
+         lambda: [old_to_json(s, ATTRS) for s in students],
+         lambda: Student.to_json_many(students, ATTRS)),
+        ("projection + dump",
+         lambda: json.dump([old_to_json(s, ATTRS) for s in students],
+                           io.StringIO()),
+         lambda: Student.dump_json_many(students, io.StringIO(), ATTRS)),
+    )
+    print(f"{'':>17} {'before':>8} {'after':>8} {'speed-up':>9}")
+    for name, before, after in runs:
+        old, new = timed(before), timed(after)
+        print(f"{name:>17} {old:>7.2f}s {new:>7.2f}s {old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+"""Benchmark memory per instance and construction rate of Student types.
+
+Usage: ./bench_students.py [count]
+"""
+
+import sys
+import time
+import tracemalloc
+
+Student = __import__('11-student').Student
+slotted = __import__('13-slotted_student')
+
+
+def build(kind, count):
+    """Build count students of the given kind and return the container."""
+    if kind == 'Student':
+        return [Student("John", "Doe", i) for i in range(count)]
+    if kind == 'SlottedStudent':
+        return [slotted.SlottedStudent("John", "Doe", i) for i in range(count)]
+    if kind == 'FrozenStudent':
+        return [slotted.FrozenStudent("John", "Doe", i) for i in range(count)]
+    batch = slotted.StudentBatch()
+    append = batch.append
+    for i in range(count):
+        append("John", "Doe", i)
+    return batch
+
+
+def main(count):
+    """Print bytes per student and students built per second."""
+    print(f"{'type':>15} {'bytes/student':>14} {'students/s':>12}")
+    for kind in ('Student', 'SlottedStudent', 'FrozenStudent',
+                 'StudentBatch'):
+        start = time.perf_counter()
+        build(kind, count)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        students = build(kind, count)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del students
+        print(f"{kind:>15} {size / count:>14.1f} {count / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the CustomObject record types in task_01_pickle.
+
+Reports traced memory per instance and construction rate for CustomObject,
+SlottedCustomObject and FrozenCustomObject.
+
+Usage: ./bench_task_01_pickle.py [count]
+"""
+import sys
+import time
+import tracemalloc
+
+from task_01_pickle import (CustomObject, FrozenCustomObject,
+                            SlottedCustomObject)
+
+
+def main(count):
+    """Prints bytes per object and objects built per second."""
+    print(f"{'type':>20} {'bytes/object':>13} {'objects/s':>12}")
+    for cls in (CustomObject, SlottedCustomObject, FrozenCustomObject):
+        start = time.perf_counter()
+        [cls("John", i, True) for i in range(count)]
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        objects = [cls("John", i, True) for i in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+        print(f"{cls.__name__:>20} {size / count:>13.1f} "
+              f"{count / elapsed:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
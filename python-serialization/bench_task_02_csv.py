@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark for task_02_csv.convert_csv_to_json.
+
+Generates CSV files of increasing size and converts each of them in a fresh
+process, reporting wall time and peak resident memory. The 'buffered' mode
+reproduces the previous load-everything-then-dump approach for comparison;
+the streaming modes should show a flat memory profile. The 'parallel' mode
+uses one worker process per CPU; its peak figure covers the parent only.
+
+Usage: ./bench_task_02_csv.py [rows ...]
+"""
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ('buffered', 'json', 'jsonl', 'compact', 'parallel')
+
+
+def make_csv(filename, rows):
+    """Writes a CSV file with the given number of rows."""
+    with open(filename, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'city', 'comment'])
+        for i in range(rows):
+            writer.writerow([i, f"name {i}", 'New York', 'a "quoted"\nvalue'])
+
+
+def run_one(mode, csv_filename, output_filename):
+    """Runs a single conversion in the current process and prints results."""
+    start = time.perf_counter()
+    if mode == 'buffered':
+        with open(csv_filename, 'r', encoding='utf-8') as f:
+            data_list = list(csv.DictReader(f))
+        with open(output_filename, 'w', encoding='utf-8') as f:
+            json.dump(data_list, f, indent=4)
+    else:
+        from task_02_csv import convert_csv_to_json
+        convert_csv_to_json(csv_filename, output_filename,
+                            output_format='jsonl' if mode == 'jsonl' else 'json',
+                            compact=(mode == 'compact'),
+                            workers=(os.cpu_count() if mode == 'parallel'
+                                     else None))
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed:.3f} {peak_kb}")
+
+
+def main(sizes):
+    """Runs every mode against every size in a child process."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'rows':>10} {'mode':>9} {'seconds':>9} {'peak MiB':>9}")
+        for rows in sizes:
+            csv_filename = os.path.join(tmp, f"in_{rows}.csv")
+            make_csv(csv_filename, rows)
+            for mode in MODES:
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--run',
+                     mode, csv_filename, os.path.join(tmp, 'out.json')],
+                    cwd=here, capture_output=True, text=True, check=True)
+                elapsed, peak_kb = out.stdout.split()
+                print(f"{rows:>10} {mode:>9} {float(elapsed):>9.3f} "
+                      f"{int(peak_kb) / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run_one(*sys.argv[2:5])
+    else:
+        main([int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000])
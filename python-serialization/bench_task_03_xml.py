@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the XML round-trip in task_03_xml.
+
+Writes and reads back XML documents of increasing size in a fresh process,
+reporting wall time and peak resident memory. The 'tree' mode reproduces
+the previous ElementTree.write / ET.parse approach; the 'stream' mode uses
+write_xml_items and iter_xml_items. Entries are generated lazily and read
+back without being collected, so only the XML code contributes to memory.
+
+Usage: ./bench_task_03_xml.py [entries ...]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+MODES = ('tree', 'stream')
+
+
+def entries(count):
+    """Yields count synthetic key-value pairs."""
+    for i in range(count):
+        yield f"key{i}", f"value number {i}"
+
+
+def run_one(mode, count, filename):
+    """Runs a single round-trip in the current process and prints results."""
+    count = int(count)
+    start = time.perf_counter()
+    if mode == 'tree':
+        root = ET.Element("data")
+        for key, value in entries(count):
+            ET.SubElement(root, key).text = str(value)
+        ET.ElementTree(root).write(filename, encoding='utf-8',
+                                   xml_declaration=True)
+        del root
+        write_time = time.perf_counter() - start
+        for child in ET.parse(filename).getroot():
+            pass
+    else:
+        from task_03_xml import iter_xml_items, write_xml_items
+        write_xml_items(entries(count), filename)
+        write_time = time.perf_counter() - start
+        for item in iter_xml_items(filename):
+            pass
+    read_time = time.perf_counter() - start - write_time
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{write_time:.3f} {read_time:.3f} {peak_kb}")
+
+
+def main(sizes):
+    """Runs every mode against every size in a child process."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'data.xml')
+        print(f"{'entries':>10} {'mode':>7} {'write s':>8} {'read s':>8} "
+              f"{'peak MiB':>9}")
+        for count in sizes:
+            for mode in MODES:
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--run',
+                     mode, str(count), filename],
+                    cwd=here, capture_output=True, text=True, check=True)
+                write_time, read_time, peak_kb = out.stdout.split()
+                print(f"{count:>10} {mode:>7} {float(write_time):>8.3f} "
+                      f"{float(read_time):>8.3f} "
+                      f"{int(peak_kb) / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run_one(*sys.argv[2:5])
+    else:
+        main([int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 import pickle
 import os
+import mmap
+import struct
+import sys
+from array import array
 """
 A module defining the CustomObject class with serialization and deserialization
 functionality using the pickle module.
@@ -85,3 +89,235 @@ class CustomObject:
             # Handle any other unexpected exceptions
             print(f"Deserialization failed: An unexpected error occurred: {e}")
             return None
+
+
+class PickleStore:
+    """
+    An append-only container holding many pickled objects in one file.
+
+    Records are appended to a data file and their offsets to a companion
+    index file ('<filename>.idx'), so any record can be read back by
+    position without scanning. Reads go through a memory map of the data
+    file, and objects are pickled with protocol 5 so that out-of-band
+    buffers (pickle.PickleBuffer) are written as-is and handed back as views
+    into the map instead of being copied.
+
+    Each record is laid out as:
+        pickle length, buffer count        (2 x uint64)
+        length of each buffer              (uint64 each)
+        pickle data, then each buffer      (each padded to 8 bytes)
+    """
+
+    _HEADER = struct.Struct('<QQ')
+
+    def __init__(self, filename):
+        """
+        Opens a store, creating its files if they do not exist.
+
+        Args:
+            filename (str): The filename of the data file.
+        """
+        self.filename = filename
+        self._data = open(filename, 'a+b')
+        self._index = open(filename + '.idx', 'a+b')
+
+        # An interrupted append may leave half an offset at the end
+        size = os.fstat(self._index.fileno()).st_size
+        if size % 8:
+            self._index.truncate(size - size % 8)
+        self._index.seek(0)
+        self._offsets = array('Q')
+        self._offsets.frombytes(self._index.read())
+        if sys.byteorder != 'little':
+            self._offsets.byteswap()
+
+        self._map = None
+
+    def __enter__(self):
+        """Returns the store itself for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc):
+        """Closes the store when leaving a with statement."""
+        self.close()
+
+    def close(self):
+        """Closes the underlying files."""
+        self._map = None
+        self._data.close()
+        self._index.close()
+
+    def __len__(self):
+        """Returns the number of stored objects."""
+        return len(self._offsets)
+
+    @classmethod
+    def _encode(cls, obj, chunks):
+        """
+        Appends the chunks making up one record to chunks.
+
+        Returns:
+            int: The size of the record in bytes.
+        """
+        buffers = []
+        data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+        raws = [memoryview(data)] + [buffer.raw() for buffer in buffers]
+
+        chunks.append(cls._HEADER.pack(len(data), len(buffers)))
+        chunks.append(struct.pack(f'<{len(buffers)}Q',
+                                  *(raw.nbytes for raw in raws[1:])))
+        size = cls._HEADER.size + 8 * len(buffers)
+        for raw in raws:
+            padding = -raw.nbytes % 8
+            chunks.append(raw)
+            chunks.append(b'\0' * padding)
+            size += raw.nbytes + padding
+        return size
+
+    def put_many(self, objects):
+        """
+        Appends several objects with a single write to each file.
+
+        Args:
+            objects (iterable): The objects to store.
+
+        Returns:
+            range: The positions of the stored objects.
+        """
+        self._data.seek(0, os.SEEK_END)
+        offset = self._data.tell()
+        # Keep every record 8-byte aligned, even after a torn write
+        chunks = [b'\0' * (-offset % 8)]
+        offset += len(chunks[0])
+        offsets = array('Q')
+        for obj in objects:
+            offsets.append(offset)
+            offset += self._encode(obj, chunks)
+
+        start = len(self._offsets)
+        if not offsets:
+            return range(start, start)
+
+        # Data goes first so that the index never points past it
+        self._data.writelines(chunks)
+        self._data.flush()
+        self._offsets.extend(offsets)
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        self._index.write(offsets.tobytes())
+        self._index.flush()
+        return range(start, len(self._offsets))
+
+    def put(self, obj):
+        """
+        Appends one object to the store.
+
+        Returns:
+            int: The position of the stored object.
+        """
+        return self.put_many((obj,))[0]
+
+    def get(self, i):
+        """
+        Loads the object stored at position i.
+
+        Out-of-band buffers are returned as read-only memoryviews into the
+        memory map, so large payloads are not copied.
+
+        Args:
+            i (int): The position of the object, as returned by put.
+
+        Raises:
+            IndexError: If there is no object at position i.
+        """
+        offset = self._offsets[i]
+        if self._map is None or offset >= len(self._map):
+            # The file has grown since it was mapped. Views handed out
+            # earlier keep the old map alive until they are released.
+            self._map = mmap.mmap(self._data.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+
+        data_size, count = self._HEADER.unpack_from(view, offset)
+        position = offset + self._HEADER.size
+        sizes = struct.unpack_from(f'<{count}Q', view, position)
+        position += 8 * count
+
+        data = view[position:position + data_size]
+        position += data_size + (-data_size % 8)
+        buffers = []
+        for size in sizes:
+            buffers.append(view[position:position + size])
+            position += size + (-size % 8)
+        return pickle.loads(data, buffers=buffers)
+
+    __getitem__ = get
+
+    def __iter__(self):
+        """Lazily yields the stored objects in insertion order."""
+        for i in range(len(self._offsets)):
+            yield self.get(i)
+
+
+class SlottedCustomObject:
+    """
+    A CustomObject variant that stores its attributes in __slots__.
+
+    Instances have no per-instance __dict__, which saves memory when
+    millions of them are held at once. Behaviour is otherwise the same as
+    CustomObject, including pickling with any protocol.
+    """
+
+    __slots__ = ('name', 'age', 'is_student')
+
+    __init__ = CustomObject.__init__
+    display = CustomObject.display
+    serialize = CustomObject.serialize
+    deserialize = CustomObject.__dict__['deserialize']
+
+    def __reduce__(self):
+        """Pickles the instance as a constructor call."""
+        return (self.__class__, (self.name, self.age, self.is_student))
+
+
+class FrozenCustomObject(SlottedCustomObject):
+    """
+    An immutable SlottedCustomObject.
+
+    Attributes are set once by the constructor; any later assignment or
+    deletion raises AttributeError. Frozen instances are hashable.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, name, age, is_student):
+        """
+        Initializes a FrozenCustomObject instance.
+
+        Args:
+            name (str): The name of the person.
+            age (int): The age of the person.
+            is_student (bool): Whether the person is a student.
+        """
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'age', age)
+        object.__setattr__(self, 'is_student', is_student)
+
+    def __setattr__(self, name, value):
+        """Refuses to modify the instance."""
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, name):
+        """Refuses to modify the instance."""
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __eq__(self, other):
+        """Compares two frozen objects by value."""
+        if not isinstance(other, FrozenCustomObject):
+            return NotImplemented
+        return ((self.name, self.age, self.is_student) ==
+                (other.name, other.age, other.is_student))
+
+    def __hash__(self):
+        """Hashes the object by value."""
+        return hash((self.name, self.age, self.is_student))
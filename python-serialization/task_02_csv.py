@@ -1,35 +1,303 @@
 #!/usr/bin/env python3
 import csv
+import io
 import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 """
-A module containing a function to convert data from a CSV file 
+A module containing a function to convert data from a CSV file
 to a JSON file format.
 """
 
+_quote = json.encoder.encode_basestring_ascii
 
-def convert_csv_to_json(csv_filename):
+# Inputs smaller than this are not worth splitting across processes
+MIN_SHARD_SIZE = 1 << 20
+_BLOCK_SIZE = 1 << 20
+
+
+def _format_row(row, output_format, compact):
+    """
+    Serializes a single CSV row exactly as it appears inside the output file.
+
+    For the 'json' format the row is indented one level so that the streamed
+    array is byte-identical to json.dump(rows, f, indent=4).
+
+    Args:
+        row (dict): The row produced by csv.DictReader.
+        output_format (str): Either 'json' (a JSON array) or 'jsonl'.
+        compact (bool): Whether to drop all optional whitespace.
+
+    Returns:
+        str: The serialized row, without any separator.
+    """
+    if compact:
+        return json.dumps(row, separators=(',', ':'))
+    if output_format == 'jsonl':
+        return json.dumps(row)
+    if not row:
+        return '    {}'
+    try:
+        # Fast path for the usual all-string row: skip the pure-Python
+        # indenting encoder and quote each key and value in C.
+        return '    {\n        ' + ',\n        '.join(
+            _quote(k) + ': ' + _quote(v) for k, v in row.items()
+        ) + '\n    }'
+    except TypeError:
+        # None or list values from short or long rows
+        return '    ' + json.dumps(row, indent=4).replace('\n', '\n    ')
+
+
+def _write_rows(rows, jsonfile, output_format, compact, progress, chunk_size):
+    """
+    Writes rows to an open JSON file one at a time, as they are produced.
+
+    Args:
+        rows (iterable): An iterable of row dictionaries.
+        jsonfile (file): The output file object, opened for writing.
+        output_format (str): Either 'json' (a JSON array) or 'jsonl'.
+        compact (bool): Whether to drop all optional whitespace.
+        progress (callable): Called with the number of rows written so far
+                             every chunk_size rows and once at the end.
+        chunk_size (int): The number of rows between progress callbacks.
+
+    Returns:
+        int: The number of rows written.
+    """
+    count = 0
+
+    if output_format == 'jsonl':
+        for row in rows:
+            jsonfile.write(_format_row(row, output_format, compact))
+            jsonfile.write('\n')
+            count += 1
+            if progress and count % chunk_size == 0:
+                progress(count)
+    else:
+        separator = ',' if compact else ',\n'
+        for row in rows:
+            if count == 0:
+                # Open the array lazily so that an empty input gives '[]'
+                jsonfile.write('[' if compact else '[\n')
+            else:
+                jsonfile.write(separator)
+            jsonfile.write(_format_row(row, output_format, compact))
+            count += 1
+            if progress and count % chunk_size == 0:
+                progress(count)
+
+        if count == 0:
+            jsonfile.write('[]')
+        else:
+            jsonfile.write(']' if compact else '\n]')
+
+    if progress:
+        progress(count)
+    return count
+
+
+def _quote_parity(f, start, end):
+    """
+    Returns whether offset end falls inside a quoted field, given that
+    offset start does not.
+
+    Quote characters are counted in blocks; with RFC 4180 quoting an odd
+    count means a field opened before end is still open.
+    """
+    f.seek(start)
+    inside = 0
+    remaining = end - start
+    while remaining > 0:
+        block = f.read(min(_BLOCK_SIZE, remaining))
+        if not block:
+            break
+        inside ^= block.count(b'"') & 1
+        remaining -= len(block)
+    return inside
+
+
+def _record_end(f, pos, inside):
+    """
+    Returns the offset just past the first line break at or after pos that
+    is not inside a quoted field, or the end of the file if there is none.
+
+    Args:
+        f (file): The CSV file, opened in binary mode.
+        pos (int): The offset to start scanning from.
+        inside (int): 1 if pos lies inside a quoted field, else 0.
+    """
+    f.seek(pos)
+    while True:
+        block = f.read(_BLOCK_SIZE)
+        if not block:
+            return pos
+        start = 0
+        while True:
+            newline = block.find(b'\n', start)
+            if newline < 0:
+                inside ^= block.count(b'"', start) & 1
+                break
+            inside ^= block.count(b'"', start, newline) & 1
+            if not inside:
+                return pos + newline + 1
+            start = newline + 1
+        pos += len(block)
+
+
+def _split_csv(csv_filename, shards):
+    """
+    Splits a CSV file into byte ranges that each hold whole records.
+
+    Boundaries are moved forward to the next line break that is outside any
+    quoted field, so records with embedded newlines are never cut in two.
+
+    Args:
+        csv_filename (str): The name of the input CSV file.
+        shards (int): The number of ranges to aim for.
+
+    Returns:
+        list: (start, end) byte offsets, in file order, excluding the header.
+    """
+    size = os.path.getsize(csv_filename)
+    with open(csv_filename, 'rb') as f:
+        # The header is the first record
+        bounds = [_record_end(f, 0, 0)]
+        body = size - bounds[0]
+        for k in range(1, shards):
+            target = bounds[0] + body * k // shards
+            if target <= bounds[-1]:
+                continue
+            inside = _quote_parity(f, bounds[-1], target)
+            end = _record_end(f, target, inside)
+            if end >= size:
+                break
+            bounds.append(end)
+    bounds.append(size)
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def _convert_shard(csv_filename, start, end, fieldnames,
+                   output_format, compact):
+    """
+    Parses and serializes one byte range of a CSV file in a worker process.
+
+    Returns:
+        tuple: (text, count) where text holds the serialized rows joined
+               exactly as _write_rows would write them.
+    """
+    with open(csv_filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # Decode the same way as the main path: UTF-8 with universal newlines
+    text = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+    reader = csv.DictReader(text, fieldnames=fieldnames)
+    pieces = [_format_row(row, output_format, compact) for row in reader]
+
+    if output_format == 'jsonl':
+        return ''.join(piece + '\n' for piece in pieces), len(pieces)
+    return (',' if compact else ',\n').join(pieces), len(pieces)
+
+
+def _write_parallel(csv_filename, fieldnames, jsonfile, output_format,
+                    compact, progress, workers):
+    """
+    Converts a CSV file using a pool of worker processes.
+
+    The file is split into shards which are parsed and serialized in
+    parallel; results are written back in input order, with at most two
+    shards per worker in flight, so the output is byte-identical to the
+    single-process path.
+
+    Returns:
+        int: The number of rows written.
+    """
+    shards = _split_csv(csv_filename, workers * 4)
+    count = 0
+    first = True
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        shard_iter = iter(shards)
+
+        def submit_next():
+            for start, end in shard_iter:
+                pending.append(executor.submit(
+                    _convert_shard, csv_filename, start, end, fieldnames,
+                    output_format, compact))
+                return
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        while pending:
+            text, rows = pending.popleft().result()
+            submit_next()
+            if not rows:
+                continue
+            if output_format == 'jsonl':
+                jsonfile.write(text)
+            else:
+                if first:
+                    jsonfile.write('[' if compact else '[\n')
+                else:
+                    jsonfile.write(',' if compact else ',\n')
+                jsonfile.write(text)
+            first = False
+            count += rows
+            if progress:
+                progress(count)
+
+    if output_format == 'json':
+        if first:
+            jsonfile.write('[]')
+        else:
+            jsonfile.write(']' if compact else '\n]')
+    if progress:
+        progress(count)
+    return count
+
+
+def convert_csv_to_json(csv_filename, output_filename='data.json',
+                        output_format='json', compact=False,
+                        progress=None, chunk_size=10000, workers=None):
     """
     Converts data from a CSV file into a JSON file ('data.json').
 
-    Reads the CSV data, converts each row to a dictionary, and serializes
-    the resulting list of dictionaries to JSON.
+    Rows are streamed: each row read by csv.DictReader is serialized and
+    written immediately, so memory use does not grow with the input size.
+    The output is written to a temporary file and renamed into place once
+    complete, so a failed conversion never leaves a truncated JSON file.
+
+    With workers greater than 1, large inputs are split on record
+    boundaries and converted by a pool of processes. Boundaries are found by
+    counting quote characters, which assumes standard CSV quoting (quotes
+    only around whole fields, doubled inside them).
 
     Args:
         csv_filename (str): The name of the input CSV file.
+        output_filename (str): The name of the output file.
+        output_format (str): 'json' for a JSON array (the default) or
+                             'jsonl' for JSON Lines, one object per line.
+        compact (bool): Write without indentation or spaces when True.
+        progress (callable): Optional callback receiving the number of rows
+                             written so far, every chunk_size rows.
+        chunk_size (int): The number of rows between progress callbacks.
+                          In parallel mode progress is reported per shard.
+        workers (int): The number of worker processes to use. None or 1
+                       converts in the calling process.
 
     Returns:
         bool: True if the conversion was successful, False otherwise.
     """
-    data_list = []
+    if output_format not in ('json', 'jsonl'):
+        print(f"Error: Unknown output format '{output_format}'.")
+        return False
 
     try:
         # Open the CSV file for reading
-        with open(csv_filename, mode='r', encoding='utf-8') as csvfile:
-            # Use DictReader to read data as a list of dictionaries
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                data_list.append(row)
-
+        csvfile = open(csv_filename, mode='r', encoding='utf-8')
     except FileNotFoundError:
         # Handle the exception if the specified CSV file doesn't exist
         print(f"Error: The file '{csv_filename}' was not found.")
@@ -39,16 +307,36 @@ def convert_csv_to_json(csv_filename):
         print(f"An error occurred while reading the CSV file: {e}")
         return False
 
-    # Proceed to serialization and writing to data.json
-    try:
-        # Open the output JSON file for writing
-        with open('data.json', mode='w', encoding='utf-8') as jsonfile:
-            # Serialize the list of dictionaries to JSON
-            json.dump(data_list, jsonfile, indent=4) # Use indent for readability
-        
-        return True
+    tmp_filename = output_filename + '.tmp'
 
-    except Exception as e:
-        # Handle potential writing or serialization errors
-        print(f"An error occurred while writing the JSON file: {e}")
-        return False
+    with csvfile:
+        # Use DictReader to read data one dictionary at a time
+        reader = csv.DictReader(csvfile)
+
+        try:
+            # Open the temporary output file for writing
+            with open(tmp_filename, mode='w', encoding='utf-8') as jsonfile:
+                if (workers and workers > 1 and
+                        os.path.getsize(csv_filename) >= MIN_SHARD_SIZE):
+                    _write_parallel(csv_filename, reader.fieldnames,
+                                    jsonfile, output_format, compact,
+                                    progress, workers)
+                else:
+                    _write_rows(reader, jsonfile, output_format, compact,
+                                progress, chunk_size)
+            os.replace(tmp_filename, output_filename)
+            return True
+
+        except (csv.Error, UnicodeDecodeError) as e:
+            # Handle errors raised while parsing the CSV input
+            print(f"An error occurred while reading the CSV file: {e}")
+        except Exception as e:
+            # Handle potential writing or serialization errors
+            print(f"An error occurred while writing the JSON file: {e}")
+
+    # Only reached on failure: discard the partial output
+    try:
+        os.remove(tmp_filename)
+    except OSError:
+        pass
+    return False
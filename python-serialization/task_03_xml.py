@@ -1,12 +1,185 @@
 #!/usr/bin/env python3
 import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
 """
-A module providing functions for serializing Python dictionaries to XML 
+A module providing functions for serializing Python dictionaries to XML
 and deserializing XML back into dictionaries.
 """
 
 
-def serialize_to_xml(dictionary, filename):
+def _parse_bool(text):
+    """Decodes a bool written with str(), also accepting 'true' and '1'."""
+    return text.strip().lower() in ('true', '1')
+
+
+# Scalar type names used in the type attribute, with their decoders
+_SCALARS = {
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': _parse_bool,
+    'none': lambda text: None,
+}
+
+# Python types accepted in a schema, mapped to their type names
+_TYPE_NAMES = {str: 'str', int: 'int', float: 'float', bool: 'bool',
+               type(None): 'none', dict: 'dict', list: 'list'}
+
+
+def _type_name(value):
+    """Returns the type attribute for a value, or 'str' for other types."""
+    return _TYPE_NAMES.get(type(value), 'str')
+
+
+def _write_typed(f, tag, value):
+    """Writes one element with a type attribute, recursing into containers."""
+    kind = _type_name(value)
+    if kind == 'dict':
+        children = value.items()
+    elif kind == 'list':
+        children = (('item', item) for item in value)
+    else:
+        text = '' if value is None else str(value)
+        if text:
+            f.write(f'<{tag} type="{kind}">{escape(text)}</{tag}>')
+        else:
+            f.write(f'<{tag} type="{kind}" />')
+        return
+
+    empty = True
+    for key, child in children:
+        if empty:
+            f.write(f'<{tag} type="{kind}">')
+            empty = False
+        _write_typed(f, key, child)
+    f.write(f'<{tag} type="{kind}" />' if empty else f'</{tag}>')
+
+
+def write_xml_items(items, filename, typed=False):
+    """
+    Streams key-value pairs into an XML file under a <data> root element.
+
+    Each pair is written as soon as it is produced, so memory use does not
+    depend on the number of entries. The output is byte-identical to the
+    ElementTree.write call this replaces.
+
+    Args:
+        items (iterable): An iterable of (key, value) pairs. Values are
+                          written with str().
+        filename (str): The filename of the output XML file.
+        typed (bool): When True, each element gets a type attribute and
+                      nested dicts and lists are written as child elements
+                      (list entries as <item>), so that values can be
+                      decoded back to their original types.
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        empty = True
+        for key, value in items:
+            if empty:
+                f.write('<data>')
+                empty = False
+            if typed:
+                _write_typed(f, key, value)
+                continue
+            text = str(value)
+            if text:
+                f.write(f"<{key}>{escape(text)}</{key}>")
+            else:
+                f.write(f"<{key} />")
+        f.write('<data />' if empty else '</data>')
+
+
+def _decode_element(elem):
+    """Decodes an element using its type attribute, or returns its text."""
+    kind = elem.get('type')
+    if kind is None:
+        return elem.text
+    if kind == 'dict':
+        return {child.tag: _decode_element(child) for child in elem}
+    if kind == 'list':
+        return [_decode_element(child) for child in elem]
+    return _SCALARS[kind](elem.text or '')
+
+
+def _compile_schema(spec):
+    """
+    Turns a schema entry into a decoder function taking an element.
+
+    A spec may be a type (str, int, float, bool), a type name as used in
+    the type attribute, a dict mapping child tags to specs, or a one-item
+    list holding the spec of every child. Compiling once up front keeps the
+    per-element work down to a single function call.
+    """
+    if isinstance(spec, dict):
+        decoders = {key: _compile_schema(value) for key, value in spec.items()}
+        return lambda elem: {
+            child.tag: decoders.get(child.tag, _decode_element)(child)
+            for child in elem
+        }
+    if isinstance(spec, list):
+        if len(spec) != 1:
+            raise ValueError("A list schema must hold exactly one entry")
+        decode_item = _compile_schema(spec[0])
+        return lambda elem: [decode_item(child) for child in elem]
+
+    kind = _TYPE_NAMES.get(spec, spec)
+    if kind == 'dict':
+        return _compile_schema({})
+    if kind == 'list':
+        return _compile_schema([None])
+    if kind is None:
+        return _decode_element
+    if kind in _SCALARS:
+        convert = _SCALARS[kind]
+    elif callable(spec):
+        convert = spec
+    else:
+        raise ValueError(f"Unknown schema type: {spec!r}")
+    return lambda elem: convert(elem.text or '')
+
+
+def iter_xml_items(filename, schema=None):
+    """
+    Incrementally parses an XML file and yields its entries one at a time.
+
+    Only direct children of the root element are reported. Each child is
+    cleared from the tree once it has been yielded, so element contents are
+    never accumulated. The underlying expat parser still remembers every
+    distinct tag name it has seen (a few hundred bytes each), so only
+    documents that repeat their tags are parsed in truly constant memory.
+
+    Values are decoded with the matching schema entry if there is one,
+    otherwise with the element's type attribute if it has one; anything
+    else is returned as its text.
+
+    Args:
+        filename (str): The filename of the input XML file.
+        schema (dict): Optional mapping of tags to types, see
+                       _compile_schema for the accepted forms.
+
+    Yields:
+        tuple: (tag, value) for each child of the root element.
+    """
+    decoders = {key: _compile_schema(spec)
+                for key, spec in (schema or {}).items()}
+    depth = 0
+    root = None
+    for event, elem in ET.iterparse(filename, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            decode = decoders.get(elem.tag, _decode_element)
+            yield elem.tag, decode(elem)
+            # Drop the consumed entry (and any earlier siblings)
+            root.clear()
+
+
+def serialize_to_xml(dictionary, filename, typed=False):
     """
     Serializes a Python dictionary into XML format and saves it to a file.
 
@@ -15,53 +188,38 @@ def serialize_to_xml(dictionary, filename):
     Args:
         dictionary (dict): The Python dictionary to serialize.
         filename (str): The filename of the output XML file.
+        typed (bool): Store a type attribute with each value, and nested
+                      dicts and lists as child elements.
     """
     try:
-        # Create the root element
-        root = ET.Element("data")
-
-        # Iterate through dictionary items and create child elements
-        for key, value in dictionary.items():
-            child = ET.SubElement(root, key)
-            # Convert all values to string format for storage in XML
-            child.text = str(value)
-
-        # Create an ElementTree wrapper and write it to the file
-        tree = ET.ElementTree(root)
-        
-        # Use short_empty_elements=False to ensure elements without attributes 
-        # (like <name>John</name>) are written properly.
-        # Use encoding="utf-8" and xml_declaration=True for standard XML file.
-        tree.write(filename, encoding='utf-8', xml_declaration=True)
+        # Stream each key-value pair straight to the file; untyped values
+        # are converted to string format for storage in XML
+        write_xml_items(dictionary.items(), filename, typed)
 
     except Exception as e:
         print(f"An error occurred during XML serialization: {e}")
 
 
-def deserialize_from_xml(filename):
+def deserialize_from_xml(filename, schema=None):
     """
     Reads XML data from a file and reconstructs a Python dictionary.
 
+    Values written with typed=True are decoded back to their original
+    types; a schema can be given to decode untyped files, for example
+    {'age': int, 'scores': [float], 'address': {'zip': int}}.
+
     Args:
         filename (str): The filename of the input XML file.
+        schema (dict): Optional mapping of keys to types.
 
     Returns:
         dict or None: The deserialized Python dictionary, or None if an error occurs.
     """
     try:
-        # Parse the XML file
-        tree = ET.parse(filename)
-        root = tree.getroot()
-
-        deserialized_data = {}
-
-        # Iterate through child elements of the root (which should be <data>)
-        for child in root:
-            # The tag is the key, and the text is the value
-            # Since the original data was stored as strings, we read it back as strings
-            deserialized_data[child.tag] = child.text
-
-        return deserialized_data
+        # Parse the XML file incrementally; the tag is the key, and the text
+        # is the value. Untyped values without a schema entry were stored
+        # as strings, so we read them back as strings
+        return dict(iter_xml_items(filename, schema))
 
     except FileNotFoundError:
         print(f"Error: The file '{filename}' was not found.")
@@ -69,6 +227,9 @@ def deserialize_from_xml(filename):
     except ET.ParseError:
         print(f"Error: The file '{filename}' contains malformed XML.")
         return None
+    except (KeyError, ValueError) as e:
+        print(f"Error: Could not decode the values in '{filename}': {e}")
+        return None
     except Exception as e:
         print(f"An unexpected error occurred during XML deserialization: {e}")
         return None
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+"""
+Benchmark for the /products?source=sql route of task_04_db and of its
+asynchronous variant, task_04_db_async.
+
+Each mode serves the application on a local port, and an asyncio load
+generator runs many concurrent clients against it, reporting requests per
+second and the 99th percentile latency:
+
+- 'fresh': the Flask app on a threaded WSGI server, with the previous
+  read_sql_data that opened a new connection for every request;
+- 'pool': the same server with the pooled read_sql_data;
+- 'async': the ASGI app on task_04_db_async's asyncio server, with
+  queries run on the DB thread pool and identical ones merged.
+
+Every client repeatedly asks for one of 'distinct' product ids, so that
+concurrent clients often make identical queries.
+
+Usage: ./bench_products.py [rows] [clients] [requests per client] [distinct]
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+
+def fresh_read_sql_data(product_id=None, category=None, min_price=None,
+                        max_price=None, after_id=None, limit=None):
+    """The previous implementation: one new connection per call."""
+    conn = sqlite3.connect('products.db')
+    try:
+        conn.row_factory = sqlite3.Row
+        query = "SELECT id, name, category, price FROM Products"
+        params = ()
+        if product_id is not None:
+            query += " WHERE id = ?"
+            params = (product_id,)
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+    finally:
+        conn.close()
+
+
+def populate(rows):
+    """Creates products.db in the current directory with rows products."""
+    conn = sqlite3.connect('products.db')
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS Products (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                category TEXT NOT NULL,
+                price REAL NOT NULL
+            )
+        ''')
+        conn.executemany(
+            "REPLACE INTO Products VALUES (?, ?, ?, ?)",
+            ((i, f"Product {i}", "Category", i * 1.5)
+             for i in range(1, rows + 1)))
+    conn.close()
+
+
+async def load(port, url, clients, requests, distinct):
+    """
+    Runs clients concurrent clients, each making requests requests on its
+    own keep-alive connection, and returns (elapsed, latencies).
+    """
+    latencies = []
+
+    async def client(n):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            for i in range(requests):
+                target = f"{url}&id={(n + i) % distinct + 1}"
+                start = time.perf_counter()
+                writer.write(f"GET {target} HTTP/1.1\r\n"
+                             f"Host: 127.0.0.1\r\n\r\n".encode())
+                length, close = 0, False
+                status = await reader.readline()
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b''):
+                        break
+                    name, _, value = line.decode().partition(':')
+                    name = name.strip().lower()
+                    if name == 'content-length':
+                        length = int(value)
+                    elif name == 'connection':
+                        close = value.strip().lower() == 'close'
+                if not status.startswith(b'HTTP/1.1 200'):
+                    raise RuntimeError(f"{target}: {status!r}")
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - start)
+                if close and i + 1 < requests:
+                    # The server does not keep connections alive
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(
+                        '127.0.0.1', port)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    return time.perf_counter() - start, latencies
+
+
+def report(mode, elapsed, latencies):
+    """Prints the throughput and p99 latency of one run."""
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{mode:>6}: {len(latencies) / elapsed:,.0f} requests/s, "
+          f"p99 {p99 * 1000:.1f} ms")
+
+
+def run_wsgi(app, url, clients, requests, distinct):
+    """Serves app from a threaded WSGI server and loads it."""
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server.socket.listen(1024)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        return asyncio.run(load(server.server_port, url, clients, requests,
+                                distinct))
+    finally:
+        server.shutdown()
+
+
+def run_asgi(app, serve, url, clients, requests, distinct):
+    """Serves app from the asyncio server in a thread and loads it."""
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    ports = []
+
+    def ready(port):
+        ports.append(port)
+        started.set()
+
+    async def serve_until_cancelled():
+        try:
+            await serve(app, port=0, ready=ready)
+        except asyncio.CancelledError:
+            pass
+
+    task = loop.create_task(serve_until_cancelled())
+    thread = threading.Thread(target=loop.run_until_complete, args=(task,),
+                              daemon=True)
+    thread.start()
+    started.wait()
+    try:
+        return asyncio.run(load(ports[0], url, clients, requests, distinct))
+    finally:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join()
+
+
+def main(rows, clients, requests, distinct):
+    """Runs every mode and prints its throughput and latency."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, here)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    import task_04_db
+    import task_04_db_async
+
+    pooled = task_04_db.read_sql_data
+    url = '/products?source=sql'
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        populate(rows)
+        for mode, reader in (('fresh', fresh_read_sql_data),
+                             ('pool', pooled)):
+            task_04_db.read_sql_data = reader
+            report(mode, *run_wsgi(task_04_db.app, url, clients, requests,
+                                   distinct))
+        task_04_db.read_sql_data = pooled
+        report('async', *run_asgi(task_04_db_async.app,
+                                  task_04_db_async.serve, url, clients,
+                                  requests, distinct))
+        task_04_db.db_pool.close()
+        os.chdir(here)
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [1000, 200, 20, 50][len(args):]))
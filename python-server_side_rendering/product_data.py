@@ -0,0 +1,423 @@
+#!/usr/bin/python3
+"""
+A module providing a cached, change-aware data layer for the product files
+used by the Flask applications in this directory.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice
+
+from flask import (Response, current_app, render_template,
+                   stream_with_context)
+
+
+class CachedFile:
+    """
+    Keeps the parsed contents of a data file in memory.
+
+    The file is parsed once by the given loader and served from memory
+    afterwards. It is parsed again only when its modification time or size
+    changes; to keep lookups off the disk entirely, the file is stat'ed at
+    most once every check_interval seconds.
+    """
+
+    def __init__(self, filepath, loader, check_interval=1.0):
+        """
+        Initializes the cache without loading the file yet.
+
+        Args:
+            filepath (str): The path of the data file.
+            loader (callable): Parses the file; called with filepath.
+            check_interval (float): Minimum number of seconds between two
+                                    checks of the file for changes.
+        """
+        self.filepath = filepath
+        self.loader = loader
+        self.check_interval = check_interval
+        # (contents, signature) replaced as a whole, so that readers never
+        # see the contents of one version with the signature of another
+        self._current = (None, None)
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        """Returns (mtime, size) of the file, or None if it is missing."""
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self):
+        """
+        Returns the parsed contents of the file.
+
+        Returns:
+            The value returned by the loader, or None if the file does not
+            exist. The value is shared between callers and must not be
+            modified.
+        """
+        return self.get_versioned()[0]
+
+    def get_versioned(self):
+        """
+        Returns (contents, version) of the file, where version is the
+        (mtime, size) the contents were loaded for, or None if the file
+        does not exist. Both come from the same check, so the version can
+        key caches of values derived from the contents.
+        """
+        now = time.monotonic()
+        if (self._checked is not None and
+                now - self._checked < self.check_interval):
+            return self._current
+
+        with self._lock:
+            data, previous = self._current
+            signature = self._stat()
+            if signature is None:
+                data = None
+            elif signature != previous:
+                # Stat before reading so that a change made while the file
+                # is being parsed is picked up by the next check
+                data = self.loader(self.filepath)
+            self._current = (data, signature)
+            self._checked = now
+            return self._current
+
+
+def _is_price(value):
+    """Returns whether value is a usable (numeric, non-bool) price."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_key(value):
+    """Returns whether value is a usable (integer, non-bool) pagination key."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def matches(product, category, min_price, max_price):
+    """Returns whether a single product passes the category/price filters."""
+    if category is not None and product.get('category') != category:
+        return False
+    if min_price is None and max_price is None:
+        return True
+    price = product.get('price')
+    return (_is_price(price) and
+            (min_price is None or price >= min_price) and
+            (max_price is None or price <= max_price))
+
+
+class ProductIndex:
+    """
+    In-memory indexes over a list of product dictionaries.
+
+    Built once when the data is loaded: a primary index keyed by 'id', a
+    secondary index by 'category', and price-sorted lists (overall and per
+    category) for range queries. Queries therefore cost a dict lookup or a
+    binary search instead of a scan of the whole catalog.
+
+    Id-sorted lists (overall and per category) back keyset pagination: a
+    page starts with a binary search for the last id of the previous page.
+    """
+
+    def __init__(self, products):
+        """
+        Builds the indexes.
+
+        Args:
+            products (list): The product dictionaries, in display order.
+        """
+        self.products = products
+        self.by_id = {}
+        self.by_category = {}
+        priced = []
+        keyed = []
+        for position, product in enumerate(products):
+            if not isinstance(product, dict):
+                continue
+            try:
+                self.by_id.setdefault(product.get('id'), []).append(product)
+            except TypeError:
+                # Unhashable ids can never match an integer query
+                pass
+            self.by_category.setdefault(
+                product.get('category'), []).append(product)
+            price = product.get('price')
+            if _is_price(price):
+                priced.append((price, position, product))
+            if _is_key(product.get('id')):
+                keyed.append((product['id'], position, product))
+
+        # Sorting on (price, position) keeps ties in display order
+        priced.sort(key=lambda entry: entry[:2])
+        self._prices = [entry[0] for entry in priced]
+        self._by_price = [entry[2] for entry in priced]
+        self._category_prices = {}
+        for price, _, product in priced:
+            prices, ranked = self._category_prices.setdefault(
+                product.get('category'), ([], []))
+            prices.append(price)
+            ranked.append(product)
+
+        keyed.sort(key=lambda entry: entry[:2])
+        self._ids = [entry[0] for entry in keyed]
+        self._by_key = [entry[2] for entry in keyed]
+        self._category_ids = {}
+        for key, _, product in keyed:
+            ids, ranked = self._category_ids.setdefault(
+                product.get('category'), ([], []))
+            ids.append(key)
+            ranked.append(product)
+
+    def _price_range(self, prices, ranked, min_price, max_price):
+        """Returns the products of ranked priced within the bounds."""
+        low = 0 if min_price is None else bisect_left(prices, min_price)
+        high = (len(prices) if max_price is None
+                else bisect_right(prices, max_price))
+        return ranked[low:high]
+
+    def _page(self, product_id, category, min_price, max_price,
+              after_id, limit):
+        """Returns one page of matching products, ordered by id."""
+        if product_id is not None:
+            found = [p for p in self.by_id.get(product_id, [])
+                     if _is_key(p.get('id'))]
+            ids, ranked = [product_id] * len(found), found
+        elif category is None:
+            ids, ranked = self._ids, self._by_key
+        else:
+            ids, ranked = self._category_ids.get(category, ([], []))
+
+        start = 0 if after_id is None else bisect_right(ids, after_id)
+        # Walk from the start position by index, so earlier pages cost
+        # nothing; only the price bounds may still need to skip products
+        candidates = (ranked[i] for i in range(start, len(ranked)))
+        if product_id is not None or min_price is not None or \
+                max_price is not None:
+            candidates = (p for p in candidates
+                          if matches(p, category, min_price, max_price))
+        return list(islice(candidates, limit))
+
+    def query(self, product_id=None, category=None,
+              min_price=None, max_price=None, after_id=None, limit=None):
+        """
+        Returns the products matching every given filter.
+
+        Results are in display order, except for price range queries which
+        are ordered by price. When after_id or limit is given, the results
+        are one page ordered by id instead, and only products with an
+        integer id are included.
+
+        Args:
+            product_id (int): Only the product(s) with this id.
+            category (str): Only products in this category.
+            min_price (float): Only products priced at least this much.
+            max_price (float): Only products priced at most this much.
+            after_id (int): Only products with an id greater than this,
+                            usually the last id of the previous page.
+            limit (int): At most this many products.
+
+        Returns:
+            list: The matching products; shared, must not be modified.
+        """
+        if after_id is not None or limit is not None:
+            return self._page(product_id, category, min_price, max_price,
+                              after_id, limit)
+
+        if product_id is not None:
+            found = self.by_id.get(product_id, [])
+            if category is None and min_price is None and max_price is None:
+                return found
+            return [p for p in found
+                    if matches(p, category, min_price, max_price)]
+
+        if min_price is not None or max_price is not None:
+            if category is None:
+                prices, ranked = self._prices, self._by_price
+            else:
+                prices, ranked = self._category_prices.get(category, ([], []))
+            return self._price_range(prices, ranked, min_price, max_price)
+
+        if category is not None:
+            return self.by_category.get(category, [])
+        return self.products
+
+
+def non_empty(iterable):
+    """
+    Returns an iterator over iterable that is truthy unless iterable is
+    empty, in which case an empty list is returned.
+
+    Lets a template test a lazily produced sequence with {% if %} without
+    materializing it; only the first item is read ahead.
+    """
+    iterator = iter(iterable)
+    for first in iterator:
+        return chain((first,), iterator)
+    return []
+
+
+class ProductsRequest:
+    """
+    The query parameters of a /products request, parsed and validated, and
+    the steps of serving it that do not depend on the application: reading
+    from the requested source and building the page's template context.
+
+    Parameters are 'source', 'id', 'category', 'min_price', 'max_price',
+    'after_id' and 'limit' (paging through the products in id order) and
+    'stream' (streaming the rendered page). The first invalid one sets
+    error.
+    """
+
+    def __init__(self, args):
+        """
+        Parses the parameters.
+
+        Args:
+            args (Mapping): The query parameters, e.g. Flask's request.args.
+        """
+        self.args = args
+        self.source = args.get('source')
+        self.category = args.get('category')
+        self.stream = args.get('stream', '').lower() in ('1', 'true', 'yes')
+        self.product_id = self.min_price = self.max_price = None
+        self.after_id = self.limit = None
+        self.error = None
+
+        product_id_str = args.get('id')
+        min_price_str = args.get('min_price')
+        max_price_str = args.get('max_price')
+        after_id_str = args.get('after_id')
+        limit_str = args.get('limit')
+        self.filtered = any(arg is not None for arg in (
+            product_id_str, self.category, min_price_str, max_price_str))
+
+        if product_id_str is not None:
+            try:
+                self.product_id = int(product_id_str)
+            except ValueError:
+                self.error = "Invalid product ID format."
+                return
+        try:
+            if min_price_str is not None:
+                self.min_price = float(min_price_str)
+            if max_price_str is not None:
+                self.max_price = float(max_price_str)
+        except ValueError:
+            self.error = "Invalid price format."
+            return
+        try:
+            if after_id_str is not None:
+                self.after_id = int(after_id_str)
+            if limit_str is not None:
+                self.limit = int(limit_str)
+                if self.limit < 1:
+                    raise ValueError(limit_str)
+        except ValueError:
+            self.error = "Invalid pagination parameters."
+
+    @property
+    def query(self):
+        """
+        The arguments (product_id, category, min_price, max_price,
+        after_id, limit) of a source query; one extra product is asked
+        for, to tell whether there is a next page.
+        """
+        page_size = None if self.limit is None else self.limit + 1
+        return (self.product_id, self.category, self.min_price,
+                self.max_price, self.after_id, page_size)
+
+    def reader(self, file_sources, sql_reader=None):
+        """
+        Returns a function reading the products of this request, or None
+        if it has an error (a wrong source sets one).
+
+        The function blocks (it may reload a data file or query the
+        database) and returns what page() expects.
+
+        Args:
+            file_sources (dict): CachedFiles of ProductIndexes (or
+                                 snapshots) by source name.
+            sql_reader (callable): For the 'sql' source, if any: called
+                                   with the query arguments, it returns
+                                   the products or an error message.
+        """
+        if self.error:
+            return None
+        if self.source in file_sources:
+            cached, query = file_sources[self.source], self.query
+
+            def read():
+                index = cached.get()
+                return None if index is None else index.query(*query)
+            return read
+        if self.source == 'sql' and sql_reader is not None:
+            query = self.query
+            return lambda: sql_reader(*query)
+
+        names = [f"'{name}'" for name in file_sources]
+        if sql_reader is not None:
+            names.append("'sql'")
+        self.error = ("Wrong source. Please specify " +
+                      (", ".join(names[:-1]) + ("," if len(names) > 2 else "")
+                       + " or " + names[-1]) + ".")
+        return None
+
+    def page(self, data, next_url):
+        """
+        Returns the template context of product_display.html.
+
+        Args:
+            data: The products read for this request; None if the source's
+                  data file was not found, or an error message.
+            next_url (callable): Returns the URL of the page starting after
+                                 the given id.
+        """
+        error = self.error
+        if error:
+            data = []
+        elif data is None:
+            error = (f"Error: The specified data file for source "
+                     f"'{self.source}' was not found.")
+            data = []
+        elif isinstance(data, str):
+            error, data = data, []
+        elif self.filtered and not data:
+            # Handle product not found
+            error = "Product not found"
+
+        url = None
+        if self.limit is not None and len(data) > self.limit:
+            data = data[:self.limit]
+            url = next_url(data[-1]['id'])
+        return {'products': data, 'error': error, 'next_url': url}
+
+
+def render_page(stream, **context):
+    """
+    Renders product_display.html with the given context, in the current
+    Flask application.
+
+    If stream is true, the page is sent while the template is rendered
+    (Template.generate), so the HTML of a long product list is never held
+    in memory as a whole.
+    """
+    if not stream:
+        return render_template('product_display.html', **context)
+    template = current_app.jinja_env.get_template('product_display.html')
+    current_app.update_template_context(context)
+    return Response(stream_with_context(template.generate(context)))
+
+
+def indexed(loader):
+    """
+    Wraps a product loader so that it returns a ProductIndex.
+
+    Loaders returning None (missing file) still return None.
+    """
+    def load(filepath):
+        products = loader(filepath)
+        return None if products is None else ProductIndex(products)
+    return load
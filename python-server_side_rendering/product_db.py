@@ -0,0 +1,252 @@
+#!/usr/bin/python3
+"""
+A module providing a thread-safe SQLite connection pool and a bulk
+importer for the product database used by the Flask applications in this
+directory.
+"""
+import csv
+import itertools
+import json
+import math
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+# Applied once to every new connection; journal_mode=WAL lets readers run
+# alongside a writer, and the other values trade durability of the very
+# last transaction for fewer fsyncs and keep hot pages in memory
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,       # in KiB when negative: 16 MiB
+    'mmap_size': 268435456,     # 256 MiB
+}
+
+
+class SQLitePool:
+    """
+    A pool of configured SQLite connections shared between threads.
+
+    A connection is used by one thread at a time: it is checked out for the
+    duration of a with block and returned afterwards. Connections are kept
+    open between requests, so their pragmas are applied once and their
+    statement caches (sqlite3's cached_statements) stay warm; running the
+    same SQL text again reuses the already prepared statement. Unlike
+    thread-local connections, this also works with servers that start a
+    new thread for every request.
+    """
+
+    def __init__(self, database, pragmas=None, max_idle=16,
+                 cached_statements=128):
+        """
+        Initializes the pool without opening any connection yet.
+
+        Args:
+            database (str): The path of the SQLite database file.
+            pragmas (dict): Pragmas overriding DEFAULT_PRAGMAS.
+            max_idle (int): How many idle connections to keep open.
+            cached_statements (int): Size of each connection's prepared
+                                     statement cache.
+        """
+        self.database = database
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        """Opens and configures a new connection."""
+        conn = sqlite3.connect(self.database, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row  # Allows accessing columns by name
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks out a connection for the duration of a with block.
+
+        The transaction is committed if the block succeeds and rolled back
+        if it raises, before the connection goes back to the pool.
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._release(conn)
+
+    def _release(self, conn):
+        """
+        Returns a connection to the pool, or closes it if the pool is
+        closed or already holds max_idle idle connections.
+        """
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._idle.put_nowait(conn)
+                    return
+                except queue.Full:
+                    pass
+        conn.close()
+
+    def close(self):
+        """Closes every idle connection and stops pooling new ones."""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+# --- Bulk Import ---
+
+CREATE_PRODUCTS = '''
+    CREATE TABLE IF NOT EXISTS Products (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        category TEXT NOT NULL,
+        price REAL NOT NULL
+    )
+'''
+
+CREATE_PROGRESS = '''
+    CREATE TABLE IF NOT EXISTS ImportProgress (
+        source TEXT PRIMARY KEY,
+        signature TEXT NOT NULL,
+        rows INTEGER NOT NULL
+    )
+'''
+
+# Secondary indexes, dropped during a load and rebuilt once it is done
+PRODUCT_INDEXES = {
+    'idx_products_category': 'Products (category)',
+    'idx_products_price': 'Products (price)',
+}
+
+
+def _read_product_rows(filepath):
+    """
+    Yields (id, name, category, price) tuples from a CSV, JSON or JSON
+    Lines file, skipping rows with missing or invalid fields (including
+    prices that are not finite, which SQLite would store as NULL).
+
+    CSV and JSON Lines files are streamed; a JSON file is parsed whole.
+    """
+    if filepath.endswith('.csv'):
+        f = open(filepath, 'r', newline='', encoding='utf-8')
+        products = csv.DictReader(f)
+    elif filepath.endswith('.jsonl'):
+        f = open(filepath, 'r', encoding='utf-8')
+        products = (json.loads(line) for line in f if line.strip())
+    else:
+        f = open(filepath, 'r', encoding='utf-8')
+        products = json.load(f)
+
+    with f:
+        for product in products:
+            try:
+                price = float(product['price'])
+                row = (int(product['id']), str(product['name']),
+                       str(product['category']), price)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if math.isfinite(price):
+                yield row
+
+
+def import_products(filepath, database='products.db', batch_size=10000,
+                    progress=None):
+    """
+    Loads a products.csv / products.json file of any size into the
+    Products table.
+
+    Rows are inserted with executemany, one transaction per batch, and the
+    secondary indexes are only rebuilt once all rows are in. The number of
+    rows committed is recorded in the same transaction as each batch, so an
+    interrupted import resumes where it stopped when run again with the
+    same, unchanged file.
+
+    Args:
+        filepath (str): The CSV, JSON or JSON Lines file to import.
+        database (str): The path of the SQLite database file.
+        batch_size (int): The number of rows per transaction.
+        progress (callable): Called with the number of rows imported so
+                             far after every batch.
+
+    Returns:
+        int: The number of rows imported from the file.
+    """
+    st = os.stat(filepath)
+    source = os.path.abspath(filepath)
+    signature = f"{st.st_mtime_ns}:{st.st_size}"
+
+    conn = sqlite3.connect(database)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute(CREATE_PRODUCTS)
+            conn.execute(CREATE_PROGRESS)
+            for name in PRODUCT_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+        row = conn.execute(
+            "SELECT signature, rows FROM ImportProgress WHERE source = ?",
+            (source,)).fetchone()
+        done = row[1] if row and row[0] == signature else 0
+
+        try:
+            rows = _read_product_rows(filepath)
+            # Skip the rows committed by an interrupted run
+            for _ in itertools.islice(rows, done):
+                pass
+
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO Products (id, name, "
+                        "category, price) VALUES (?, ?, ?, ?)", batch)
+                    done += len(batch)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO ImportProgress "
+                        "(source, signature, rows) VALUES (?, ?, ?)",
+                        (source, signature, done))
+                if progress:
+                    progress(done)
+        finally:
+            # Rebuilt even when the load fails, so that the live database
+            # is never left without its indexes
+            with conn:
+                for name, target in PRODUCT_INDEXES.items():
+                    conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+        with conn:
+            conn.execute("DELETE FROM ImportProgress WHERE source = ?",
+                         (source,))
+        return done
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    # Usage: ./product_db.py products.csv [database]
+    count = import_products(
+        sys.argv[1], *sys.argv[2:3],
+        progress=lambda n: print(f"Imported {n} rows", end='\r'))
+    print(f"Imported {count} rows from {sys.argv[1]}")
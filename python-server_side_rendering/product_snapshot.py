@@ -0,0 +1,384 @@
+#!/usr/bin/python3
+"""
+A module providing a compiled, memory-mapped columnar snapshot of a
+products file, so that the Flask applications in this directory can serve
+a large catalog right after startup without parsing it.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from product_data import ProductIndex, matches
+
+# magic, byte order check, rows, categories, source mtime, source size,
+# name blob size, category blob size
+_HEADER = struct.Struct('=8sIQQqQQQ')
+_MAGIC = b'PRODSNAP'
+_BYTE_ORDER = 0x01020304
+
+# (name, typecode) of the per-row sections, in file order; the row orders
+# list row numbers sorted by the given key, ties in display order
+_SECTIONS = (
+    ('ids', 'q'),                # id of every row, in display order
+    ('prices', 'd'),             # price of every row
+    ('codes', 'I'),              # category number of every row
+    ('name_offsets', 'Q'),       # n + 1 offsets into the name blob
+    ('by_id', 'I'),              # rows by id
+    ('ids_sorted', 'q'),         # ids in that order
+    ('by_price', 'I'),           # rows by price
+    ('prices_sorted', 'd'),      # prices in that order
+    ('by_category', 'I'),        # rows by category
+    ('by_category_id', 'I'),     # rows by (category, id)
+    ('category_ids', 'q'),       # ids in that order
+    ('by_category_price', 'I'),  # rows by (category, price)
+    ('category_prices', 'd'),    # prices in that order
+)
+_FIELDS = {'id', 'name', 'category', 'price'}
+
+
+# Where snapshots are kept by default, outside the source tree
+DEFAULT_SNAPSHOT_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'product-snapshots')
+
+
+def _snapshot_path(filepath, directory):
+    """
+    Returns the path of the snapshot of filepath in directory; files of
+    the same name in different places get different snapshots.
+    """
+    filepath = os.path.abspath(filepath)
+    digest = hashlib.blake2b(filepath.encode('utf-8'),
+                             digest_size=8).hexdigest()
+    return os.path.join(directory,
+                        f"{os.path.basename(filepath)}-{digest}.snap")
+
+
+def _aligned(size):
+    """Rounds size up to a multiple of 8."""
+    return (size + 7) & ~7
+
+
+def _columnar(products):
+    """
+    Returns the columns of products as a dict of arrays, or None if some
+    product does not have exactly an integer id, a numeric price and a
+    string name and category.
+    """
+    ids, prices, codes = array('q'), array('d'), array('I')
+    name_offsets, names = array('Q', [0]), []
+    categories = {}
+    end = 0
+    for product in products:
+        if not isinstance(product, dict) or product.keys() != _FIELDS:
+            return None
+        key, price = product['id'], product['price']
+        name, category = product['name'], product['category']
+        if (not isinstance(key, int) or isinstance(key, bool) or
+                not isinstance(price, (int, float)) or
+                isinstance(price, bool) or price != price or
+                not isinstance(name, str) or not isinstance(category, str)):
+            return None
+        if not -2 ** 63 <= key < 2 ** 63:
+            return None
+        ids.append(key)
+        prices.append(price)
+        codes.append(categories.setdefault(category, len(categories)))
+        encoded = name.encode('utf-8')
+        names.append(encoded)
+        end += len(encoded)
+        name_offsets.append(end)
+
+    n = len(ids)
+    by_id = sorted(range(n), key=ids.__getitem__)
+    by_price = sorted(range(n), key=prices.__getitem__)
+    # Sorting is stable, so these keep the order of the sort they start from
+    by_category = sorted(range(n), key=codes.__getitem__)
+    by_category_id = sorted(by_id, key=codes.__getitem__)
+    by_category_price = sorted(by_price, key=codes.__getitem__)
+
+    bounds = array('Q', [0] * (len(categories) + 1))
+    for code in codes:
+        bounds[code + 1] += 1
+    for code in range(len(categories)):
+        bounds[code + 1] += bounds[code]
+
+    category_offsets, end = array('Q', [0]), 0
+    for category in categories:
+        end += len(category.encode('utf-8'))
+        category_offsets.append(end)
+
+    return {
+        'ids': ids, 'prices': prices, 'codes': codes,
+        'name_offsets': name_offsets,
+        'by_id': array('I', by_id),
+        'ids_sorted': array('q', (ids[i] for i in by_id)),
+        'by_price': array('I', by_price),
+        'prices_sorted': array('d', (prices[i] for i in by_price)),
+        'by_category': array('I', by_category),
+        'by_category_id': array('I', by_category_id),
+        'category_ids': array('q', (ids[i] for i in by_category_id)),
+        'by_category_price': array('I', by_category_price),
+        'category_prices': array('d', (prices[i] for i in by_category_price)),
+        'bounds': bounds,
+        'category_offsets': category_offsets,
+        'names': b''.join(names),
+        'categories': ''.join(categories).encode('utf-8'),
+    }
+
+
+def write_snapshot(products, path, signature):
+    """
+    Writes the snapshot of products to path, creating its directory.
+
+    The snapshot is written to a temporary file and renamed into place, so
+    readers only ever see a complete snapshot.
+
+    Args:
+        products (list): The product dictionaries, in display order.
+        path (str): The snapshot file.
+        signature (tuple): The (mtime, size) of the products file they
+                           were loaded from, when read.
+
+    Returns:
+        bool: False if the products cannot be stored in a snapshot.
+    """
+    columns = _columnar(products)
+    if columns is None:
+        return False
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            parts = [_HEADER.pack(
+                _MAGIC, _BYTE_ORDER, len(columns['ids']),
+                len(columns['bounds']) - 1, signature[0], signature[1],
+                len(columns['names']), len(columns['categories']))]
+            parts += [columns[name] for name, _ in _SECTIONS]
+            parts += [columns['bounds'], columns['category_offsets'],
+                      columns['names'], columns['categories']]
+            for part in parts:
+                data = part.tobytes() if isinstance(part, array) else part
+                f.write(data)
+                f.write(b'\0' * (_aligned(len(data)) - len(data)))
+        # mkstemp creates the file readable by its owner only
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
+
+
+class _Rows:
+    """
+    A read-only sequence of products of a snapshot, given by row numbers;
+    each product dictionary is built when it is accessed.
+    """
+
+    def __init__(self, snapshot, rows):
+        """
+        Args:
+            snapshot (ProductSnapshot): The snapshot holding the rows.
+            rows (sequence): The row numbers, in order.
+        """
+        self._snapshot = snapshot
+        self._rows = rows
+
+    def __len__(self):
+        """Returns the number of products."""
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        """Returns the product at position i, or a _Rows for a slice."""
+        if isinstance(i, slice):
+            return _Rows(self._snapshot, self._rows[i])
+        return self._snapshot.product(self._rows[i])
+
+    def __iter__(self):
+        """Yields the products, building each one as it is reached."""
+        product = self._snapshot.product
+        for row in self._rows:
+            yield product(row)
+
+
+class ProductSnapshot:
+    """
+    A memory-mapped snapshot of a products file.
+
+    Opening one maps the file and slices it into typed arrays; no product
+    is parsed or built until a query returns it. Queries take the same
+    arguments and give the same results as ProductIndex.query, using the
+    sorted row orders stored in the snapshot, and return sequences whose
+    product dictionaries are built as they are read.
+    """
+
+    def __init__(self, path):
+        """
+        Maps a snapshot file.
+
+        Raises:
+            ValueError: If path is not a snapshot of this platform.
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if len(view) < _HEADER.size:
+            raise ValueError(f"{path} is not a product snapshot")
+        (magic, byte_order, n, c, mtime, size,
+         names_size, categories_size) = _HEADER.unpack_from(view)
+        if magic != _MAGIC or byte_order != _BYTE_ORDER:
+            raise ValueError(f"{path} is not a product snapshot")
+        self.signature = (mtime, size)
+
+        offset = _aligned(_HEADER.size)
+
+        def section(typecode, count):
+            nonlocal offset
+            size = array(typecode).itemsize * count
+            if offset + size > len(view):
+                raise ValueError(f"{path} is truncated")
+            data = view[offset:offset + size]
+            offset += _aligned(size)
+            return data.cast(typecode)
+
+        for name, typecode in _SECTIONS:
+            setattr(self, name,
+                    section(typecode, n + 1 if name == 'name_offsets' else n))
+        self.bounds = section('Q', c + 1)
+        category_offsets = section('Q', c + 1)
+        self._names = section('B', names_size)
+        blob = str(section('B', categories_size), 'utf-8')
+        self.categories = [blob[category_offsets[i]:category_offsets[i + 1]]
+                           for i in range(c)]
+        self._codes = {name: code for code, name in enumerate(self.categories)}
+        self.products = _Rows(self, range(n))
+
+    def product(self, row):
+        """Returns the product dictionary of a row."""
+        start, end = self.name_offsets[row], self.name_offsets[row + 1]
+        return {'id': self.ids[row],
+                'name': str(self._names[start:end], 'utf-8'),
+                'category': self.categories[self.codes[row]],
+                'price': self.prices[row]}
+
+    def _category_range(self, category):
+        """Returns the (start, end) of a category in the category orders."""
+        code = self._codes.get(category)
+        if code is None:
+            return 0, 0
+        return self.bounds[code], self.bounds[code + 1]
+
+    def _with_id(self, product_id):
+        """Returns the rows with product_id, in display order."""
+        low = bisect_left(self.ids_sorted, product_id)
+        high = bisect_right(self.ids_sorted, product_id)
+        return self.by_id[low:high]
+
+    def query(self, product_id=None, category=None,
+              min_price=None, max_price=None, after_id=None, limit=None):
+        """
+        Returns the products matching every given filter; see
+        ProductIndex.query.
+
+        Returns:
+            A sequence of product dictionaries (built when read).
+        """
+        if after_id is not None or limit is not None:
+            return self._page(product_id, category, min_price, max_price,
+                              after_id, limit)
+
+        if product_id is not None:
+            found = _Rows(self, self._with_id(product_id))
+            if category is None and min_price is None and max_price is None:
+                return found
+            return [p for p in found
+                    if matches(p, category, min_price, max_price)]
+
+        if min_price is not None or max_price is not None:
+            if category is None:
+                start, end = 0, len(self.prices_sorted)
+                prices, ranked = self.prices_sorted, self.by_price
+            else:
+                start, end = self._category_range(category)
+                prices, ranked = self.category_prices, self.by_category_price
+            low = (start if min_price is None
+                   else bisect_left(prices, min_price, start, end))
+            high = (end if max_price is None
+                    else bisect_right(prices, max_price, start, end))
+            return _Rows(self, ranked[low:max(low, high)])
+
+        if category is not None:
+            start, end = self._category_range(category)
+            return _Rows(self, self.by_category[start:end])
+        return self.products
+
+    def _page(self, product_id, category, min_price, max_price,
+              after_id, limit):
+        """Returns one page of matching products, ordered by id."""
+        if product_id is not None:
+            rows = self._with_id(product_id)
+            if after_id is not None and product_id <= after_id:
+                rows = rows[:0]
+        else:
+            if category is None:
+                start, end = 0, len(self.ids_sorted)
+                ids, ranked = self.ids_sorted, self.by_id
+            else:
+                start, end = self._category_range(category)
+                ids, ranked = self.category_ids, self.by_category_id
+            if after_id is not None:
+                start = bisect_right(ids, after_id, start, end)
+            rows = ranked[start:end]
+
+        candidates = iter(_Rows(self, rows))
+        if product_id is not None or min_price is not None or \
+                max_price is not None:
+            candidates = (p for p in candidates
+                          if matches(p, category, min_price, max_price))
+        return list(islice(candidates, limit))
+
+
+def snapshotted(loader, directory=None):
+    """
+    Wraps a product loader so that it returns a ProductSnapshot.
+
+    Snapshots are kept in directory (DEFAULT_SNAPSHOT_DIR if None), as
+    '<file name>-<hash of its path>.snap'. A snapshot is mapped directly if
+    it was made from the current version of the file. Otherwise the file
+    is parsed with loader and the snapshot is rewritten first. Products
+    that do not fit a snapshot, or a directory that cannot be written,
+    fall back to a ProductIndex; loaders returning None (missing file)
+    still return None.
+    """
+    def load(filepath):
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        signature = (st.st_mtime_ns, st.st_size)
+        path = _snapshot_path(filepath, directory or DEFAULT_SNAPSHOT_DIR)
+        try:
+            snapshot = ProductSnapshot(path)
+            if snapshot.signature == signature:
+                return snapshot
+        except (OSError, ValueError):
+            pass
+
+        products = loader(filepath)
+        if products is None:
+            return None
+        try:
+            if write_snapshot(products, path, signature):
+                return ProductSnapshot(path)
+        except OSError as e:
+            print(f"Could not write snapshot {path}: {e}")
+        return ProductIndex(products)
+    return load
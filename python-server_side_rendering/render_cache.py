@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""
+A module providing a cache of rendered Jinja pages with strong ETags for
+the Flask applications in this directory.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from flask import Response, render_template, request
+
+
+class RenderCache:
+    """
+    Keeps rendered pages in memory, keyed by template name.
+
+    An entry is valid for one version of the page's data, given by the
+    caller (e.g. CachedFile.get_versioned), and one version of the template
+    folder, so editing any template, including one that is only included
+    or extended, invalidates every entry. Each entry has a strong ETag, and
+    a request whose If-None-Match lists it (weakly or not) gets an empty 304 response; a
+    repeat view therefore costs a dict lookup and, at most once every
+    check_interval seconds, a stat of the template files.
+    """
+
+    def __init__(self, app, check_interval=1.0, max_entries=128):
+        """
+        Initializes an empty cache.
+
+        Args:
+            app (Flask): The application whose templates are rendered.
+            check_interval (float): Minimum number of seconds between two
+                                    checks of the templates for changes.
+            max_entries (int): How many rendered pages to keep.
+        """
+        self.app = app
+        self.check_interval = check_interval
+        self.max_entries = max_entries
+        self._entries = {}
+        self._templates = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def _stat_templates(self):
+        """Returns the (path, mtime, size) of every template file."""
+        folder = os.path.join(self.app.root_path, self.app.template_folder)
+        signature = []
+        for dirpath, _, filenames in os.walk(folder):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                signature.append((path, st.st_mtime_ns, st.st_size))
+        return tuple(sorted(signature))
+
+    def _templates_version(self):
+        """
+        Returns the current version of the template folder, dropping every
+        cached page (and Jinja's compiled templates) when it changes.
+        """
+        now = time.monotonic()
+        if (self._checked is not None and
+                now - self._checked < self.check_interval):
+            return self._templates
+
+        with self._lock:
+            signature = self._stat_templates()
+            if signature != self._templates:
+                self._entries.clear()
+                if self.app.jinja_env.cache is not None:
+                    self.app.jinja_env.cache.clear()
+            self._templates = signature
+            self._checked = now
+            return signature
+
+    def render(self, template_name, version=None, **context):
+        """
+        Returns the response for template_name rendered with context.
+
+        The page is only rendered if no entry exists for this version of
+        the data and of the templates; context is otherwise unused.
+
+        Args:
+            template_name (str): The template to render.
+            version: Any hashable value that changes whenever context does.
+            context: The variables passed to the template.
+
+        Returns:
+            Response: The page with its ETag, or an empty 304 response if
+                      the client already has it.
+        """
+        key = (version, self._templates_version())
+        entry = self._entries.get(template_name)
+        if entry is None or entry[0] != key:
+            body = render_template(template_name, **context).encode('utf-8')
+            etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+            entry = (key, etag, body)
+            with self._lock:
+                self._entries.pop(template_name, None)
+                self._entries[template_name] = entry
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+
+        _, etag, body = entry
+        # If-None-Match uses the weak comparison (RFC 9110, 13.1.2)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='text/html')
+        response.set_etag(etag)
+        return response
@@ -3,26 +3,263 @@
 A module containing a function to generate personalized invitation files
 from a template and a list of attendee objects.
 """
-import os
+import itertools
 import logging
+import re
+import sys
+import time
+import zipfile
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # Configure logging to output to console
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
-def generate_invitations(template, attendees):
+# The attendee fields that can appear in a template as {field}
+PLACEHOLDERS = ("name", "event_title", "event_date", "event_location")
+_PLACEHOLDER_RE = re.compile(
+    "|".join(re.escape("{" + key + "}") for key in PLACEHOLDERS))
+
+
+class CompiledTemplate:
+    """
+    An invitation template parsed once into literal and placeholder
+    segments, so that rendering an attendee is a single join instead of
+    one str.replace pass over the template per placeholder.
+    """
+
+    def __init__(self, template):
+        """
+        Splits the template on its placeholders.
+
+        Args:
+            template (str): The invitation template string with placeholders.
+        """
+        self.template = template
+        self._parts = []
+        self._slots = []
+        position = 0
+        for match in _PLACEHOLDER_RE.finditer(template):
+            if match.start() > position:
+                self._parts.append(template[position:match.start()])
+            self._slots.append((len(self._parts), match.group()[1:-1]))
+            self._parts.append(None)
+            position = match.end()
+        if position < len(template):
+            self._parts.append(template[position:])
+
+    def render(self, attendee):
+        """
+        Returns the template filled in with one attendee's data; missing or
+        None values are rendered as "N/A".
+        """
+        parts = self._parts.copy()
+        get = attendee.get
+        for index, key in self._slots:
+            value = get(key)
+            parts[index] = "N/A" if value is None else str(value)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=32)
+def compile_template(template):
+    """Returns the CompiledTemplate for template, parsing it only once."""
+    return CompiledTemplate(template)
+
+
+def render_invitations(template, attendees):
+    """
+    Yields (index, attendee, text) for every attendee, counting from 1.
+
+    attendees may be any iterable, including a generator; attendees are
+    rendered one at a time, so memory use does not depend on their number.
+    Items that are not dictionaries are logged and skipped: their text is
+    None, so that writers can still account for their index.
+    """
+    compiled = compile_template(template)
+    for index, attendee in enumerate(attendees, 1):
+        if not isinstance(attendee, dict):
+            logging.error(f"Invalid input: Attendee {index} is not a dictionary, skipped.")
+            yield index, attendee, None
+            continue
+        yield index, attendee, compiled.render(attendee)
+
+
+class _Progress:
+    """Counts generated invitations and logs aggregated progress."""
+
+    def __init__(self, every):
+        self.every = every
+        self.generated = 0
+        self.failed = 0
+        self.start = time.monotonic()
+
+    def record(self, ok=True):
+        """Counts one invitation, logging progress every `every` of them."""
+        if ok:
+            self.generated += 1
+        else:
+            self.failed += 1
+        if self.every and (self.generated + self.failed) % self.every == 0:
+            rate = self.generated / max(time.monotonic() - self.start, 1e-9)
+            logging.info(f"Progress: {self.generated} invitations generated, {self.failed} failed ({rate:.0f}/s)")
+
+    def finish(self, target):
+        """Logs the final totals."""
+        elapsed = time.monotonic() - self.start
+        logging.info(f"Generated {self.generated} invitations in {target} ({self.failed} failed, {elapsed:.2f}s)")
+
+
+def _write_invitation(filename, text):
+    """Writes one rendered invitation to filename."""
+    with open(filename, 'w') as f:
+        f.write(text)
+
+
+def _finish_write(future, filename, progress):
+    """Waits for one background write and records its outcome."""
+    try:
+        future.result()
+        progress.record()
+    except IOError as e:
+        logging.error(f"Could not write file {filename}: {e}")
+        progress.record(ok=False)
+
+
+def _write_files(rendered, workers, progress):
+    """Writes every invitation to its own output_{index}.txt file."""
+    # At most a few writes per thread are in flight, which bounds memory
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for index, attendee, text in rendered:
+            if text is None:
+                continue
+            output_filename = f"output_{index}.txt"
+            future = pool.submit(_write_invitation, output_filename, text)
+            pending.append((future, output_filename, progress))
+            if len(pending) >= 4 * workers:
+                _finish_write(*pending.popleft())
+        while pending:
+            _finish_write(*pending.popleft())
+    progress.finish("output_*.txt files")
+
+
+def _write_zip(rendered, bundle, compress, progress):
+    """Writes every invitation as an output_{index}.txt member of a zip."""
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    date_time = time.localtime()[:6]
+    with zipfile.ZipFile(bundle, 'w', compression) as zf:
+        for index, attendee, text in rendered:
+            if text is None:
+                continue
+            info = zipfile.ZipInfo(f"output_{index}.txt", date_time)
+            info.compress_type = compression
+            zf.writestr(info, text.encode('utf-8'))
+            progress.record()
+
+
+def _write_flat(rendered, bundle, compress, progress):
+    """
+    Writes every invitation, one after the other, to a single data file,
+    and their offsets to '<bundle>.idx' (see read_invitation).
+
+    The index is a sequence of little-endian uint64 words: a flags word
+    (1: each invitation is zlib-compressed), then 0, then the end offset of
+    each invitation, so invitation i spans words i to i + 1 after the flags.
+    """
+    def flush(offsets):
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        offsets.tofile(idx)
+
+    with open(bundle, 'wb') as data, open(bundle + '.idx', 'wb') as idx:
+        # The index starts with a flags word (1: zlib), then the offset
+        # where each invitation starts, counting from 1
+        flush(array('Q', [1 if compress else 0, 0]))
+        offsets = array('Q')
+        position = 0
+        for index, attendee, text in rendered:
+            if text is not None:
+                record = text.encode('utf-8')
+                if compress:
+                    record = zlib.compress(record)
+                data.write(record)
+                position += len(record)
+                progress.record()
+            # Attendees that were skipped get an empty record, so indexes
+            # still match the attendee numbers
+            offsets.append(position)
+            if len(offsets) >= 65536:
+                flush(offsets)
+                offsets = array('Q')
+        flush(offsets)
+
+
+def read_invitation(bundle, index):
+    """
+    Returns invitation number index (counting from 1) from a flat bundle
+    written by generate_invitations, reading only that invitation.
+
+    Returns:
+        str: The invitation, or None if index is out of range.
+    """
+    with open(bundle + '.idx', 'rb') as idx:
+        words = array('Q')
+        words.frombytes(idx.read(8))
+        if index < 1:
+            return None
+        idx.seek(8 * index)
+        words.frombytes(idx.read(16))
+    if sys.byteorder != 'little':
+        words.byteswap()
+    if len(words) < 3:
+        return None
+    flags, start, end = words
+    if start == end:
+        # A skipped attendee (never compressed, even in a zlib bundle)
+        return ''
+    with open(bundle, 'rb') as data:
+        data.seek(start)
+        record = data.read(end - start)
+    if flags & 1:
+        record = zlib.decompress(record)
+    return record.decode('utf-8')
+
+
+def generate_invitations(template, attendees, workers=4, bundle=None,
+                         compress=False, progress_every=10000):
     """
     Generates personalized invitation files from a template and a list of attendees.
 
+    By default every invitation is written to its own output_{index}.txt
+    file. With bundle, all of them go into that single file instead: a zip
+    archive of output_{index}.txt members if its name ends in '.zip', and
+    otherwise a flat file of invitations plus a '<bundle>.idx' offset index
+    that read_invitation uses to read any one of them back.
+
     Args:
         template (str): The invitation template string with placeholders.
-        attendees (list): A list of dictionaries, where each dictionary
-                          contains data for one attendee.
+        attendees (iterable): A list of dictionaries, where each dictionary
+                              contains data for one attendee, or any other
+                              iterable (e.g. a generator) of them.
+        workers (int): The number of threads writing the output files.
+        bundle (str): The file to write all invitations into.
+        compress (bool): Compress the invitations in a bundle (deflate for
+                         a zip, zlib per invitation for a flat bundle).
+        progress_every (int): Log progress every this many invitations.
     """
     # 1. Check Input Types
     if not isinstance(template, str):
         logging.error("Invalid input: Template must be a string.")
         return
-    if not isinstance(attendees, list) or not all(isinstance(a, dict) for a in attendees):
+    if isinstance(attendees, (str, bytes, dict)) or not hasattr(attendees, '__iter__'):
+        logging.error("Invalid input: Attendees must be a list of dictionaries.")
+        return
+    # A list is checked up front; other iterables are checked item by item
+    if isinstance(attendees, list) and not all(isinstance(a, dict) for a in attendees):
         logging.error("Invalid input: Attendees must be a list of dictionaries.")
         return
 
@@ -31,41 +268,31 @@ def generate_invitations(template, attendees):
         logging.error("Template is empty, no output files generated.")
         return
 
-    # 3. Handle Empty Attendees List
-    if not attendees:
+    # 3. Handle Empty Attendees List (read one attendee ahead to find out)
+    attendees = iter(attendees)
+    for first in attendees:
+        attendees = itertools.chain((first,), attendees)
+        break
+    else:
         logging.error("No data provided, no output files generated.")
         return
 
-    # Define the required placeholders
-    placeholders = ["{name}", "{event_title}", "{event_date}", "{event_location}"]
-    
-    # 4. Process Each Attendee and Generate Output Files
-    for index, attendee in enumerate(attendees, 1):
-        processed_template = template
-        output_filename = f"output_{index}.txt"
-        
-        # Iterate over placeholders to replace them
-        for placeholder in placeholders:
-            key = placeholder.strip("{}")
-            
-            # Retrieve value, handling missing or None values with "N/A"
-            value = attendee.get(key)
-            if value is None:
-                replacement = "N/A"
-            else:
-                replacement = str(value)
-            
-            # Replace the placeholder in the template
-            processed_template = processed_template.replace(placeholder, replacement)
-        
-        # 5. Write the processed template to the output file
-        try:
-            with open(output_filename, 'w') as f:
-                f.write(processed_template)
-            logging.info(f"Successfully generated invitation for {attendee.get('name', 'N/A')} in {output_filename}")
-        except IOError as e:
-            logging.error(f"Could not write file {output_filename}: {e}")
-            
+    # 4. Render Each Attendee and Write the Output Files or the Bundle
+    rendered = render_invitations(template, attendees)
+    progress = _Progress(progress_every)
+    if bundle is None:
+        _write_files(rendered, workers, progress)
+        return
+    try:
+        if bundle.endswith('.zip'):
+            _write_zip(rendered, bundle, compress, progress)
+        else:
+            _write_flat(rendered, bundle, compress, progress)
+    except IOError as e:
+        logging.error(f"Could not write file {bundle}: {e}")
+        return
+    progress.finish(bundle)
+
 # --- Example Usage (as defined in the instructions) ---
 if __name__ == '__main__':
     # Create the template file content required for the test
@@ -119,3 +346,9 @@ if __name__ == '__main__':
     # Test Case 6: Invalid input types (List contains non-dict)
     print("\n--- Test Case 6: Invalid List Content ---")
     generate_invitations(template_content, attendees_data + ["not_a_dict"])
+
+    # Test Case 7: All invitations in a single compressed bundle
+    print("\n--- Test Case 7: Compressed Bundle ---")
+    generate_invitations(template_content, attendees_data,
+                         bundle='invitations.bundle', compress=True)
+    print(read_invitation('invitations.bundle', 2))
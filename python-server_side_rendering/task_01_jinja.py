@@ -3,27 +3,31 @@
 A basic Flask application that renders multiple HTML pages using Jinja2
 templates and demonstrates the use of reusable components.
 """
-from flask import Flask, render_template
+from flask import Flask
+from render_cache import RenderCache
 
 # Instantiate the Flask application
 app = Flask(__name__)
 
+# Pages are rendered once and re-rendered only when a template changes
+pages = RenderCache(app)
+
 # --- Routes ---
 
 @app.route('/')
 def home():
     """Renders the index.html template (Home page)."""
-    return render_template('index.html')
+    return pages.render('index.html')
 
 @app.route('/about')
 def about():
     """Renders the about.html template (About Us page)."""
-    return render_template('about.html')
+    return pages.render('about.html')
 
 @app.route('/contact')
 def contact():
     """Renders the contact.html template (Contact Us page)."""
-    return render_template('contact.html')
+    return pages.render('contact.html')
 
 # --- Run Server ---
 
@@ -3,31 +3,24 @@
 A Flask application that loads data from a JSON file and renders it
 dynamically using Jinja loops and conditional statements.
 """
-from flask import Flask, render_template
+from flask import Flask
 import json
 import os
+from product_data import CachedFile
+from render_cache import RenderCache
 
 # Instantiate the Flask application
 app = Flask(__name__)
 
-# --- Routes ---
+# Pages are rendered once and re-rendered only when a template or the data
+# they show changes
+pages = RenderCache(app)
 
-@app.route('/')
-def home():
-    """Renders the index.html template (Home page)."""
-    return render_template('index.html')
+# --- Data Loading ---
 
-@app.route('/items')
-def items():
-    """
-    Reads item data from items.json and renders items.html,
-    passing the list of items to the template.
-    """
-    # Define the path to the items.json file
-    json_file_path = os.path.join(os.path.dirname(__file__), 'items.json')
+def read_items(json_file_path):
+    """Reads the list of items from items.json."""
     items_list = []
-
-    # Read data from items.json
     try:
         with open(json_file_path, 'r') as f:
             data = json.load(f)
@@ -41,9 +34,34 @@ def items():
         print(f"Error: Could not decode JSON from {json_file_path}.")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
+    return items_list
+
+# items.json is parsed once, and again only when it changes
+items_file = CachedFile(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'items.json'),
+    read_items)
+
+# --- Routes ---
+
+@app.route('/')
+def home():
+    """Renders the index.html template (Home page)."""
+    return pages.render('index.html')
+
+@app.route('/items')
+def items():
+    """
+    Reads item data from items.json and renders items.html,
+    passing the list of items to the template.
+    """
+    items_list, version = items_file.get_versioned()
+    if items_list is None:
+        print(f"Error: {items_file.filepath} not found.")
+        items_list = []
 
-    # Render the template, passing the list of items
-    return render_template('items.html', items=items_list)
+    # Render the template (or reuse the page rendered for this version of
+    # items.json), passing the list of items
+    return pages.render('items.html', version, items=items_list)
 
 # (Optional: Include other routes from Task 01 here if required for completeness)
 # @app.route('/about')
@@ -3,10 +3,12 @@
 A Flask application that reads product data from JSON or CSV files,
 filters it based on URL query parameters, and renders it dynamically.
 """
-from flask import Flask, render_template, request
+from flask import Flask, request, url_for
 import json
 import csv
 import os
+from product_data import CachedFile, ProductsRequest, render_page
+from product_snapshot import snapshotted
 
 # Instantiate the Flask application
 app = Flask(__name__)
@@ -50,63 +52,45 @@ def read_csv_data(filepath):
         print(f"An error occurred while reading CSV: {e}")
         return []
 
+# --- Cached Data Sources ---
+
+# Each file is compiled into a memory-mapped snapshot (kept in
+# product_snapshot.DEFAULT_SNAPSHOT_DIR) once, and again only when it
+# changes; later starts map the snapshot directly
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sources = {
+    'json': CachedFile(os.path.join(BASE_DIR, 'products.json'),
+                       snapshotted(read_json_data)),
+    'csv': CachedFile(os.path.join(BASE_DIR, 'products.csv'),
+                      snapshotted(read_csv_data)),
+}
+
 # --- Flask Route ---
 
 @app.route('/products', methods=['GET'])
 def products():
     """
-    Handles product display logic based on 'source' and 'id' query parameters.
+    Handles product display logic based on 'source', 'id', 'category',
+    'min_price' and 'max_price' query parameters.
+
+    'after_id' and 'limit' page through the products in id order, and
+    'stream=1' streams the rendered page.
     """
-    # Get query parameters
-    source = request.args.get('source')
-    product_id_str = request.args.get('id')
-    
+    # 1. Parse and Validate the query parameters
+    products_request = ProductsRequest(request.args)
+
+    # 2. Determine Source and Look Up Data in the Indexes (served from the
+    # in-memory cache)
     data = []
-    error_message = None
-    
-    # 1. Determine Source and Load Data
-    if source == 'json':
-        filepath = os.path.join(os.path.dirname(__file__), 'products.json')
-        data = read_json_data(filepath)
-    elif source == 'csv':
-        filepath = os.path.join(os.path.dirname(__file__), 'products.csv')
-        data = read_csv_data(filepath)
-    else:
-        # Handle wrong source
-        error_message = "Wrong source. Please specify 'json' or 'csv'."
-        # If the data file itself wasn't found (e.g., read_*_data returned None)
-    if data is None:
-        error_message = f"Error: The specified data file for source '{source}' was not found."
-        data = []
-    
-    # 2. Filter Data by ID (if provided and no initial error)
-    if product_id_str is not None and not error_message:
-        try:
-            # Convert the ID parameter to an integer
-            product_id = int(product_id_str)
-            
-            # Filter the loaded data
-            filtered_data = [product for product in data if product.get('id') == product_id]
-            
-            if not filtered_data:
-                # Handle product not found
-                error_message = "Product not found"
-                data = [] # Clear data list to prevent empty table rendering
-            else:
-                data = filtered_data # Replace full list with filtered list
-                
-        except ValueError:
-            # Handle non-integer ID
-            error_message = "Invalid product ID format."
-            data = []
+    read = products_request.reader(sources)
+    if read is not None:
+        data = read()
 
     # 3. Render Template
     # Pass the final list of data (filtered or full) and any error message
-    return render_template(
-        'product_display.html',
-        products=data,
-        error=error_message
-    )
+    return render_page(products_request.stream, **products_request.page(
+        data, lambda after_id: url_for('products', **dict(
+            request.args.to_dict(), after_id=after_id))))
 
 # --- Run Server ---
 
@@ -3,19 +3,42 @@
 A Flask application that reads product data from JSON, CSV, or SQLite database,
 filters it based on URL query parameters, and renders it dynamically.
 """
-from flask import Flask, render_template, request
+from flask import Flask, request, url_for
 import json
 import csv
 import sqlite3
 import os
+import sys
+from product_data import (CachedFile, ProductsRequest, non_empty,
+                          render_page)
+from product_snapshot import snapshotted
+from product_db import SQLitePool, import_products
 
 # Instantiate the Flask application
 app = Flask(__name__)
 
 # --- Database Setup and Management ---
 
-def create_database():
-    """Creates the SQLite database and populates the Products table."""
+# Connections to products.db are opened once, configured with WAL mode and
+# the default pragmas, and reused across requests
+db_pool = SQLitePool('products.db')
+
+def create_database(source=None):
+    """
+    Creates the SQLite database and populates the Products table, either
+    with example data or, if source is given, with the products of a CSV
+    or JSON file of any size.
+    """
+    if source is not None:
+        try:
+            count = import_products(
+                source, 'products.db',
+                progress=lambda n: print(f"Imported {n} products", end='\r'))
+            print(f"Imported {count} products from {source}")
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"Database error during import: {e}")
+        return
+
     conn = None
     try:
         # Connects to the database (creates it if it doesn't exist)
@@ -79,105 +102,131 @@ def read_csv_data(filepath):
         print(f"An error occurred while reading CSV: {e}")
         return None
 
-def read_sql_data(product_id=None):
-    """Reads data from the SQLite database, optionally filtered by ID."""
-    conn = None
-    data = []
+def iter_sql_data(product_id=None, category=None, min_price=None,
+                  max_price=None, after_id=None, limit=None, batch_size=1000):
+    """
+    Yields product dictionaries from the SQLite database, optionally
+    filtered by ID, category and price range.
+
+    Products come in the same order as from ProductIndex.query: by id
+    (the table's order), except price range queries, which are ordered by
+    price. With after_id or limit, yields one page of products ordered by
+    id (keyset pagination: 'id > after_id' is answered from the primary
+    key, however deep the page). Rows are fetched batch_size at a time, and
+    the pooled connection is held until the generator is exhausted or
+    closed.
+    """
+    # Build query
+    query = "SELECT id, name, category, price FROM Products"
+    conditions = []
+    params = []
+    
+    if product_id is not None:
+        conditions.append("id = ?")
+        params.append(product_id)
+    if category is not None:
+        conditions.append("category = ?")
+        params.append(category)
+    if min_price is not None:
+        conditions.append("price >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        conditions.append("price <= ?")
+        params.append(max_price)
+    if after_id is not None:
+        conditions.append("id > ?")
+        params.append(after_id)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    if after_id is not None or limit is not None:
+        query += " ORDER BY id"
+    elif min_price is not None or max_price is not None:
+        # Ties keep the table's order, like the price-sorted indexes
+        query += " ORDER BY price, id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    
+    # A pooled connection reuses its prepared statement for this query
+    with db_pool.connection() as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            # Convert sqlite3.Row objects to standard dictionaries
+            for row in rows:
+                yield dict(row)
+
+def read_sql_data(product_id=None, category=None, min_price=None,
+                  max_price=None, after_id=None, limit=None):
+    """
+    Reads data from the SQLite database, optionally filtered by ID,
+    category and price range, and paginated by id.
+    """
     try:
-        conn = sqlite3.connect('products.db')
-        conn.row_factory = sqlite3.Row  # Allows accessing columns by name
-        cursor = conn.cursor()
-        
-        # Build query
-        query = "SELECT id, name, category, price FROM Products"
-        params = ()
-        
-        if product_id is not None:
-            query += " WHERE id = ?"
-            params = (product_id,)
-        
-        cursor.execute(query, params)
-        
-        # Convert sqlite3.Row objects to standard dictionaries
-        rows = cursor.fetchall()
-        data = [dict(row) for row in rows]
-        
-        return data
+        return list(iter_sql_data(product_id, category, min_price, max_price,
+                                  after_id, limit))
     except sqlite3.Error as e:
         # Return an error message to be displayed in the template
         return f"Database Error: {e}"
-    finally:
-        if conn:
-            conn.close()
+
+# --- Cached Data Sources ---
+
+# Each file is compiled into a memory-mapped snapshot (kept in
+# product_snapshot.DEFAULT_SNAPSHOT_DIR) once, and again only when it
+# changes; later starts map the snapshot directly
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+file_sources = {
+    'json': CachedFile(os.path.join(BASE_DIR, 'products.json'),
+                       snapshotted(read_json_data)),
+    'csv': CachedFile(os.path.join(BASE_DIR, 'products.csv'),
+                      snapshotted(read_csv_data)),
+}
 
 # --- Flask Route ---
 
 @app.route('/products', methods=['GET'])
 def products():
     """
-    Handles product display logic based on 'source' and 'id' query parameters.
+    Handles product display logic based on 'source', 'id', 'category',
+    'min_price' and 'max_price' query parameters.
+
+    'after_id' and 'limit' page through the products in id order, and
+    'stream=1' streams the rendered page; SQL rows are then read from the
+    cursor while the page is being sent.
     """
-    source = request.args.get('source')
-    product_id_str = request.args.get('id')
-    
+    # 1. Parse and Validate the query parameters
+    products_request = ProductsRequest(request.args)
+
+    # 2. Determine Source and Load Data (only if no parsing error)
     data = []
-    error_message = None
-    product_id = None
-    
-    # 1. Parse and Validate optional ID
-    if product_id_str is not None:
+    if (not products_request.error and products_request.source == 'sql'
+            and products_request.stream and products_request.limit is None):
+        # Rows are fetched while the page is rendered; reading the first
+        # one up front still reports database errors here
         try:
-            product_id = int(product_id_str)
-        except ValueError:
-            error_message = "Invalid product ID format."
-    
-    # 2. Determine Source and Load Data (only if no ID parsing error)
-    if not error_message:
-        base_dir = os.path.dirname(__file__)
-        
-        if source == 'json':
-            filepath = os.path.join(base_dir, 'products.json')
-            data = read_json_data(filepath)
-        elif source == 'csv':
-            filepath = os.path.join(base_dir, 'products.csv')
-            data = read_csv_data(filepath)
-        elif source == 'sql':
-            # SQLite function handles both filtered and full lists
-            data = read_sql_data(product_id)
-            if isinstance(data, str):
-                error_message = data
-                data = []
-        else:
-            # Handle wrong source
-            error_message = "Wrong source. Please specify 'json', 'csv', or 'sql'."
-            
-        # Handle File Not Found errors for JSON/CSV (read_*_data returns None)
-        if data is None:
-             error_message = f"Error: The specified data file for source '{source}' was not found."
-             data = []
-        
-        # 3. Apply ID Filter (for JSON/CSV sources only, SQL is filtered in the function)
-        if source in ['json', 'csv'] and product_id is not None and not error_message:
-            filtered_data = [product for product in data if product.get('id') == product_id]
-            
-            if not filtered_data:
-                error_message = "Product not found"
-                data = []
-            else:
-                data = filtered_data
-
-    # 4. Render Template
-    return render_template(
-        'product_display.html',
-        products=data,
-        error=error_message
-    )
+            data = non_empty(iter_sql_data(*products_request.query))
+        except sqlite3.Error as e:
+            data = f"Database Error: {e}"
+    else:
+        # JSON/CSV data is served from the in-memory indexes, SQL data is
+        # read from the database
+        read = products_request.reader(file_sources, read_sql_data)
+        if read is not None:
+            data = read()
+
+    # 3. Render Template
+    return render_page(products_request.stream, **products_request.page(
+        data, lambda after_id: url_for('products', **dict(
+            request.args.to_dict(), after_id=after_id))))
 
 # --- Run Server ---
 
 if __name__ == '__main__':
-    # 0. Setup Database before starting the application
-    create_database()
+    # 0. Setup Database before starting the application, optionally
+    # importing a products file given on the command line
+    create_database(sys.argv[1] if len(sys.argv) > 1 else None)
     
     # Run the application on the default host and port
     app.run(debug=True, port=5000)
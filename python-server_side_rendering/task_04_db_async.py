@@ -0,0 +1,254 @@
+#!/usr/bin/python3
+"""
+An asynchronous (ASGI) variant of the /products service of task_04_db.
+
+SQLite queries, and lookups in the JSON/CSV files (which may have to
+reload a changed file), run on a dedicated pool of threads, so the event
+loop never blocks on I/O, and identical queries made concurrently are
+merged into one (single-flight): the first request runs the query and the
+others wait for its result. Run it with any ASGI server, e.g.
+'uvicorn task_04_db_async:app', or directly with the small HTTP/1.1
+server below if none is installed.
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from product_data import ProductsRequest
+from task_04_db import create_database, file_sources, read_sql_data
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+templates = Environment(
+    loader=FileSystemLoader(os.path.join(BASE_DIR, 'templates')),
+    autoescape=select_autoescape(['html']))
+
+# Threads that run the blocking work: sqlite3 calls (each on a pooled
+# connection), product file lookups and page rendering
+db_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='db')
+
+
+class SingleFlight:
+    """
+    Merges identical concurrent calls: while a call for a key is running,
+    later callers with the same key await its result instead of starting
+    their own.
+    """
+
+    def __init__(self, executor):
+        """
+        Args:
+            executor (Executor): Where the blocking calls are run.
+        """
+        self.executor = executor
+        self._inflight = {}
+
+    async def run(self, key, func, *args):
+        """
+        Returns func(*args), run in the executor unless a call with the
+        same key is already in flight. The result is shared between all
+        the callers that awaited it and must not be modified.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, func, *args)
+            self._inflight[key] = future
+            future.add_done_callback(
+                lambda _: self._inflight.pop(key, None))
+        # A cancelled waiter must not cancel the query of the others
+        return await asyncio.shield(future)
+
+
+queries = SingleFlight(db_executor)
+
+# --- Request Handling ---
+
+async def products(args):
+    """
+    Returns the product_display.html page for the query parameters in
+    args, with the same parameters and messages as task_04_db.products.
+    """
+    products_request = ProductsRequest(args)
+    data = []
+    read = products_request.reader(file_sources, read_sql_data)
+    if read is not None:
+        # Every read runs on the thread pool: SQL queries, and file lookups
+        # too, since they may reload (and parse) a changed file
+        data = await queries.run(
+            (products_request.source, products_request.query), read)
+
+    context = products_request.page(
+        data, lambda after_id: '/products?' + urlencode(
+            dict(args, after_id=after_id)))
+    # Rendering a long page takes a while (and loading the template may
+    # read it from disk), so it does not run on the event loop either
+    return await asyncio.get_running_loop().run_in_executor(
+        db_executor, lambda: templates.get_template(
+            'product_display.html').render(**context))
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                db_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    if scope['path'] != '/products':
+        status, body = 404, b'Not Found'
+        content_type = b'text/plain; charset=utf-8'
+    elif scope['method'] not in ('GET', 'HEAD'):
+        status, body = 405, b'Method Not Allowed'
+        content_type = b'text/plain; charset=utf-8'
+    else:
+        # Like Flask's request.args.get, keep the first of repeated keys
+        args = {}
+        for key, value in parse_qsl(scope['query_string'].decode('latin-1'),
+                                    keep_blank_values=True):
+            args.setdefault(key, value)
+        status, body = 200, (await products(args)).encode('utf-8')
+        content_type = b'text/html; charset=utf-8'
+
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type),
+                    (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body',
+                'body': b'' if scope['method'] == 'HEAD' else body})
+
+# --- Minimal HTTP/1.1 Server ---
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 500: 'Internal Server Error'}
+BAD_REQUEST = (b'HTTP/1.1 400 Bad Request\r\n'
+               b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+
+
+async def _handle_connection(asgi_app, reader, writer):
+    """Serves the requests of one (keep-alive) connection."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            try:
+                method, target, version = \
+                    request_line.decode('latin-1').split()
+            except ValueError:
+                writer.write(BAD_REQUEST)
+                break
+            headers = []
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers.append((name.strip().lower().encode('latin-1'),
+                                value.strip().encode('latin-1')))
+            fields = dict(headers)
+            length = fields.get(b'content-length', b'0')
+            if not length.isdigit():
+                # Negative, signed or not a number: the request cannot be
+                # framed, so neither can any that follows on the connection
+                writer.write(BAD_REQUEST)
+                break
+            length = int(length)
+            request_body = await reader.readexactly(length) if length else b''
+            connection = fields.get(b'connection', b'').lower()
+            keep_alive = (connection != b'close' if version == 'HTTP/1.1'
+                          else connection == b'keep-alive')
+
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'},
+                'http_version': version.partition('/')[2],
+                'method': method, 'scheme': 'http', 'path': path,
+                'raw_path': path.encode('latin-1'),
+                'query_string': query.encode('latin-1'),
+                'root_path': '', 'headers': headers,
+                'client': writer.get_extra_info('peername'),
+                'server': writer.get_extra_info('sockname'),
+            }
+
+            async def receive():
+                return {'type': 'http.request', 'body': request_body,
+                        'more_body': False}
+
+            response = []
+
+            async def send(message):
+                response.append(message)
+
+            try:
+                await asgi_app(scope, receive, send)
+                start = response[0]
+                body = b''.join(m.get('body', b'') for m in response[1:])
+            except Exception as e:
+                print(f"Error while handling {target}: {e}", file=sys.stderr)
+                start = {'status': 500, 'headers': []}
+                body, keep_alive = b'', False
+
+            status = start['status']
+            head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+            head += [f"{name.decode('latin-1')}: {value.decode('latin-1')}"
+                     for name, value in start['headers']]
+            if not any(name.lower() == b'content-length'
+                       for name, _ in start['headers']):
+                head.append(f"Content-Length: {len(body)}")
+            head.append("Connection: " + ("keep-alive" if keep_alive
+                                          else "close"))
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+                         + body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(asgi_app=app, host='127.0.0.1', port=5000, ready=None):
+    """
+    Serves an ASGI application over HTTP/1.1 until cancelled.
+
+    Args:
+        asgi_app: The ASGI application.
+        host (str): The address to listen on.
+        port (int): The port to listen on; 0 picks a free one.
+        ready (callable): Called with the bound port once listening.
+    """
+    server = await asyncio.start_server(
+        lambda r, w: _handle_connection(asgi_app, r, w), host, port,
+        backlog=1024)
+    if ready:
+        ready(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+# --- Run Server ---
+
+if __name__ == '__main__':
+    create_database(sys.argv[1] if len(sys.argv) > 1 else None)
+    try:
+        import uvicorn
+    except ImportError:
+        uvicorn = None
+    if uvicorn is not None:
+        uvicorn.run(app, host='127.0.0.1', port=5000)
+    else:
+        print("Serving on http://127.0.0.1:5000/products")
+        asyncio.run(serve())
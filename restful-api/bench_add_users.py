@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+"""
+Benchmark for adding users to task_04_flask one at a time and in bulk.
+
+The Flask app is served on a threaded WSGI server on a local port, with
+an empty in-memory store for each mode, and an asyncio load generator
+runs concurrent clients against it, reporting users added per second:
+
+- 'single': one POST /add_user per user;
+- 'array': POST /add_users with batches of users as a JSON array;
+- 'ndjson': POST /add_users with batches of users as NDJSON.
+
+Usage: ./bench_add_users.py [users] [clients] [batch size]
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+
+def requests_for(mode, names, batch_size):
+    """Returns the (path, content type, body) of each request of a mode."""
+    users = [{"username": name, "name": name.title(), "age": 30,
+              "city": "New York"} for name in names]
+    if mode == 'single':
+        return [('/add_user', 'application/json', json.dumps(user))
+                for user in users]
+    batches = [users[i:i + batch_size]
+               for i in range(0, len(users), batch_size)]
+    if mode == 'array':
+        return [('/add_users', 'application/json', json.dumps(batch))
+                for batch in batches]
+    return [('/add_users', 'application/x-ndjson',
+             ''.join(json.dumps(user) + '\n' for user in batch))
+            for batch in batches]
+
+
+async def load(port, requests, clients):
+    """
+    Sends requests from clients concurrent clients, each taking the next
+    unsent request until none are left, and returns the elapsed time.
+    """
+    pending = iter(requests)
+
+    async def client():
+        reader = writer = None
+        try:
+            for path, content_type, body in pending:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(
+                        '127.0.0.1', port)
+                body = body.encode()
+                writer.write(f"POST {path} HTTP/1.1\r\n"
+                             f"Host: 127.0.0.1\r\n"
+                             f"Content-Type: {content_type}\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n"
+                             .encode() + body)
+                status = await reader.readline()
+                length, close = 0, status.startswith(b'HTTP/1.0')
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b''):
+                        break
+                    name, _, value = line.decode().partition(':')
+                    name, value = name.strip().lower(), value.strip().lower()
+                    if name == 'content-length':
+                        length = int(value)
+                    elif name == 'connection':
+                        close = value == 'close'
+                if not status.split()[1].startswith(b'2'):
+                    raise RuntimeError(f"{path}: {status!r}")
+                await reader.readexactly(length)
+                if close:
+                    # The server does not keep connections alive
+                    writer.close()
+                    writer = None
+        finally:
+            if writer is not None:
+                writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return time.perf_counter() - start
+
+
+def main(users, clients, batch_size, modes=('single', 'array', 'ndjson')):
+    """Runs every mode and prints the users added per second."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    import task_04_flask
+    from user_store import UserStore
+
+    names = [f"user{i:08d}" for i in range(users)]
+    server = make_server('127.0.0.1', 0, task_04_flask.app, threaded=True)
+    server.socket.listen(1024)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for mode in modes:
+            task_04_flask.users = UserStore()
+            requests = requests_for(mode, names, batch_size)
+            elapsed = asyncio.run(load(server.server_port, requests,
+                                       clients))
+            if len(task_04_flask.users) != users:
+                raise RuntimeError(f"{mode}: {len(task_04_flask.users)} "
+                                   f"users added, not {users}")
+            print(f"{mode:>6}: {users / elapsed:,.0f} users/s "
+                  f"({len(requests)} requests)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [20000, 16, 1000][len(args):]))
@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+"""
+Load generator benchmark for the serving modes of task_03_http_server.
+
+Each mode runs the server in its own process on a free local port, and
+an asyncio load generator runs many concurrent clients against it over
+keep-alive connections (reconnecting whenever the server closes one).
+Requests per second and the 99th and 99.9th percentile and maximum
+latencies are reported for:
+
+- 'simple': the previous HTTPServer, one HTTP/1.0 connection at a time;
+- 'thread': the ThreadingHTTPServer with a bounded worker pool;
+- 'async': the asyncio server.
+
+Usage: ./bench_http_server.py [clients] [requests per client] [workers]
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PATHS = ('/', '/data', '/info', '/status')
+
+# The server as it was: HTTP/1.0, single-threaded; run with the port as
+# its argument
+SIMPLE = '''
+import http.server, sys
+from task_03_http_server import MyHandler
+class Handler(MyHandler):
+    protocol_version = 'HTTP/1.0'
+class Server(http.server.HTTPServer):
+    request_queue_size = 1024  # the default of 5 resets connections here
+Server(('localhost', int(sys.argv[1])), Handler).serve_forever()
+'''
+
+
+def free_port():
+    """Returns a currently unused local port."""
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def start(mode, port, workers):
+    """Starts the server process for mode and waits until it listens."""
+    if mode == 'simple':
+        args = [sys.executable, '-c', SIMPLE, str(port)]
+    else:
+        args = [sys.executable, 'task_03_http_server.py', mode, str(port),
+                str(workers)]
+    process = subprocess.Popen(args, cwd=HERE)
+    for _ in range(100):
+        try:
+            socket.create_connection(('localhost', port), 0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+async def load(port, clients, requests):
+    """Runs the clients and returns (elapsed, latencies)."""
+    latencies = []
+
+    async def client(n):
+        reader = writer = None
+        try:
+            for i in range(requests):
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(
+                        'localhost', port)
+                path = PATHS[(n + i) % len(PATHS)]
+                start = time.perf_counter()
+                writer.write(f"GET {path} HTTP/1.1\r\n"
+                             f"Host: localhost\r\n\r\n".encode())
+                status = await reader.readline()
+                length, close = None, status.startswith(b'HTTP/1.0')
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b''):
+                        break
+                    name, _, value = line.decode().partition(':')
+                    name, value = name.strip().lower(), value.strip().lower()
+                    if name == 'content-length':
+                        length = int(value)
+                    elif name == 'connection':
+                        close = value == 'close'
+                if length is None:
+                    await reader.read()
+                    close = True
+                else:
+                    await reader.readexactly(length)
+                latencies.append(time.perf_counter() - start)
+                if close:
+                    writer.close()
+                    writer = None
+        finally:
+            if writer is not None:
+                writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    return time.perf_counter() - start, latencies
+
+
+def percentile(ordered, fraction):
+    """Returns the value below which fraction of the sorted values lie."""
+    return ordered[max(int(len(ordered) * fraction) - 1, 0)]
+
+
+def main(clients, requests, workers, modes=('simple', 'thread', 'async')):
+    """Benchmarks every mode and prints its throughput and latency."""
+    for mode in modes:
+        port = free_port()
+        process = start(mode, port, workers)
+        try:
+            elapsed, latencies = asyncio.run(load(port, clients, requests))
+        finally:
+            process.terminate()
+            process.wait()
+        latencies.sort()
+        print(f"{mode:>6}: {len(latencies) / elapsed:,.0f} requests/s, "
+              f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+              f"p99.9 {percentile(latencies, 0.999) * 1000:.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [100, 100, 32][len(args):]))
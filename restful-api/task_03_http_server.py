@@ -1,39 +1,419 @@
 #!/usr/bin/python3
-"""This is just a doc"""
+"""
+A simple API built with http.server.
 
+Requests are dispatched through a route table, and the responses of
+static routes are encoded once, at startup. The API can be served by a
+ThreadingHTTPServer whose requests are handled by a bounded pool of
+worker threads, or by an asyncio server; both speak HTTP/1.1 and keep
+connections alive between requests.
 
+Usage: ./task_03_http_server.py [thread|async] [port] [workers]
+"""
+
+
+import asyncio
 import http.server
 import json
+import selectors
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 501: 'Not Implemented'}
+
+
+class Response:
+    """
+    A complete HTTP response, encoded once.
+
+    The status line, headers (with Content-Length) and body are joined
+    into the bytes sent on the wire when the response is created, so
+    sending it is a single write of a prebuilt byte string.
+    """
+
+    def __init__(self, status, content_type, body, headers=()):
+        """
+        Encodes a response.
+
+        Args:
+            status (int): The HTTP status code.
+            content_type (str): The Content-Type header.
+            body (bytes or str): The body; a str is encoded as UTF-8.
+            headers (iterable): Further (name, value) headers.
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.status = status
+        self.body = body
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in headers]
+        # (head only, close connection) -> bytes
+        self._wire = {}
+        for close in (False, True):
+            lines = head + ["Connection: close"] if close else head
+            encoded = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+            self._wire[(True, close)] = encoded
+            self._wire[(False, close)] = encoded + body
+
+    @classmethod
+    def json(cls, data, status=200):
+        """Returns a JSON response."""
+        return cls(status, 'application/json', json.dumps(data))
+
+    def wire(self, head=False, close=False):
+        """Returns the bytes to send; head omits the body (for HEAD)."""
+        return self._wire[(head, close)]
+
+
+class Router:
+    """
+    A table of routes, looked up segment by segment.
+
+    Routes are stored in a tree with one level per path segment, so finding
+    the route of a path costs a dict lookup per segment, however many
+    routes there are. A segment written '<name>' matches any value, which is
+    passed to the route's handler as a keyword argument; literal segments
+    take precedence over parameters.
+    """
+
+    def __init__(self):
+        # node: [literal children, (parameter name, child), {method: target}]
+        self._root = [{}, None, {}]
+
+    def add(self, method, pattern, target):
+        """
+        Adds a route.
+
+        Args:
+            method (str): The HTTP method, e.g. 'GET' or 'POST'.
+            pattern (str): The path, e.g. '/data/<field>'.
+            target: A Response, sent as is, or a function called with the
+                    request body (bytes) and the path parameters, which
+                    returns a Response.
+        """
+        node = self._root
+        for segment in pattern.strip('/').split('/') if pattern != '/' else ():
+            if segment.startswith('<') and segment.endswith('>'):
+                if node[1] is None:
+                    node[1] = (segment[1:-1], [{}, None, {}])
+                node = node[1][1]
+            else:
+                node = node[0].setdefault(segment, [{}, None, {}])
+        node[2][method] = target
+
+    def route(self, method, pattern):
+        """Decorator form of add() for handler functions."""
+        def decorator(func):
+            self.add(method, pattern, func)
+            return func
+        return decorator
+
+    def dispatch(self, method, path, body=b''):
+        """Returns the Response for a request."""
+        node, params = self._root, {}
+        path = path.partition('?')[0]
+        for segment in path.strip('/').split('/') if path != '/' else ():
+            child = node[0].get(segment)
+            if child is None:
+                if node[1] is None:
+                    return NOT_FOUND
+                name, child = node[1]
+                params[name] = segment
+            node = child
+
+        methods = node[2]
+        target = methods.get(method)
+        if target is None and method == 'HEAD':
+            target = methods.get('GET')
+        if target is None:
+            if not methods:
+                return NOT_FOUND
+            # HEAD is answered wherever GET is
+            allow = ', '.join(sorted(
+                set(methods) | ({'HEAD'} if 'GET' in methods else set())))
+            return Response(405, 'text', b'Method not allowed',
+                            [('Allow', allow)])
+        if isinstance(target, Response):
+            return target
+        return target(body, **params)
+
+
+NOT_FOUND = Response(404, 'text', b'Endpoint not found')
+BAD_REQUEST = Response(400, 'text', b'Bad request')
+
+# --- Routes ---
+
+DATA = {"name": "John", "age": 30, "city": "New York"}
+INFO = {"version": "1.0", "description": "A simple API built with http.server"}
+
+router = Router()
+router.add('GET', '/', Response(200, 'text', b'Hello, this is a simple API!'))
+router.add('GET', '/data', Response.json(DATA))
+router.add('GET', '/info', Response.json(INFO))
+router.add('GET', '/status', Response(200, 'text', b'OK'))
 
 
 class MyHandler(http.server.BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-Type', 'text')
-            self.end_headers()
-            self.wfile.write(b'Hello, this is a simple API!')
-        elif self.path == '/data':
-            data = {"name": "John", "age": 30, "city": "New York"}
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(data).encode('utf-8'))
-        elif self.path == '/info':
-            data = {"version": "1.0", "description": "A simple API built with http.server"}
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(data).encode('utf-8'))
-        elif self.path == '/status':
-            self.send_response(200)
-            self.send_header('Content-Type', 'text')
-            self.end_headers()
-            self.wfile.write(b'OK')
+    # HTTP/1.1 keeps the connection open for further requests, which needs
+    # a Content-Length on every response
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections are closed after this many seconds
+    timeout = 5
+    # Send each response at once instead of letting a small write wait for
+    # the client's delayed ACK on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        """
+        Serves the requests of the connection. On a server with a park()
+        method, such as PooledHTTPServer, returns as soon as no request is
+        waiting, leaving the connection open and self.parked set, so that
+        the server can call handle() again when the next one arrives.
+        """
+        self.parked = False
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if hasattr(self.server, 'park') and not self._request_waiting():
+                self.parked = True
+                return
+            self.handle_one_request()
+
+    def _request_waiting(self):
+        """Returns whether more of the next request can be read at once."""
+        # What the client sent may already be buffered in rfile, where a
+        # selector on the socket would not see it
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            self.close_connection = True
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def finish(self):
+        # A parked connection stays open, and keeps its buffered rfile
+        if not self.parked:
+            super().finish()
+
+    def dispatch(self):
+        """Reads the request body and sends the Response of its route."""
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Where the body ends is unknown, so the connection cannot be
+            # reused either
+            self.close_connection = True
+            self.wfile.write(BAD_REQUEST.wire(self.command == 'HEAD', True))
+            return
+        body = self.rfile.read(length) if length else b''
+        response = router.dispatch(self.command, self.path, body)
+        self.wfile.write(response.wire(self.command == 'HEAD',
+                                       self.close_connection))
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = dispatch
+
+    def log_message(self, format, *args):
+        # One line on stderr per request would dominate the serving time
+        pass
+
+
+class PooledHTTPServer(http.server.ThreadingHTTPServer):
+    """
+    A ThreadingHTTPServer that hands requests to a fixed pool of worker
+    threads instead of starting a thread per connection.
+
+    A worker holds a connection only while it has a request to serve. New
+    connections, and kept-alive ones between requests, are parked in a
+    selector watched by a single thread, which queues a connection for the
+    next free worker once its client sends a request, and closes it once
+    it has been idle for the handler's timeout. So at most `workers`
+    requests are served at once, but idle clients never keep a worker from
+    serving the others.
+    """
+    request_queue_size = 1024
+
+    def __init__(self, server_address, handler_class, workers=32):
+        """Binds the server and starts a pool of `workers` threads."""
+        super().__init__(server_address, handler_class)
+        self.pool = ThreadPoolExecutor(max_workers=workers,
+                                       thread_name_prefix='http')
+        self._selector = selectors.DefaultSelector()
+        # park() writes a byte to _waker to wake the watcher thread up
+        self._wakeup, self._waker = socket.socketpair()
+        self._selector.register(self._wakeup, selectors.EVENT_READ)
+        # (request, client_address, handler) not yet watched by the selector
+        self._parking = []
+        self._parking_lock = threading.Lock()
+        self._closing = False
+        self._watcher = threading.Thread(target=self._watch,
+                                         name='http-idle', daemon=True)
+        self._watcher.start()
+
+    def process_request(self, request, client_address):
+        """Waits for the first request of a new connection."""
+        self.park(request, client_address)
+
+    def park(self, request, client_address, handler=None):
+        """
+        Waits, without holding a worker, for the next request of a
+        connection, then serves it with handler (a new one if None).
+        """
+        with self._parking_lock:
+            wake = not self._parking
+            self._parking.append((request, client_address, handler))
+        if wake:
+            self._waker.send(b'\0')
+
+    def _serve(self, request, client_address, handler):
+        """Serves a connection on a worker until it is idle or closed."""
+        try:
+            if handler is None:
+                handler = self.RequestHandlerClass(request, client_address,
+                                                   self)
+            else:
+                handler.handle()
+                handler.finish()
+            if getattr(handler, 'parked', False):
+                self.park(request, client_address, handler)
+                return
+        except Exception:
+            self.handle_error(request, client_address)
+        self.shutdown_request(request)
+
+    def _watch(self):
+        """Runs the selector of parked connections until server_close()."""
+        timeout = self.RequestHandlerClass.timeout
+        # request -> (client_address, handler, deadline), oldest first
+        idle = {}
+        while True:
+            wait = None
+            if idle and timeout is not None:
+                deadline = next(iter(idle.values()))[2]
+                wait = max(deadline - time.monotonic(), 0)
+            for key, _ in self._selector.select(wait):
+                request = key.fileobj
+                if request is self._wakeup:
+                    self._wakeup.recv(4096)
+                    with self._parking_lock:
+                        parking, self._parking = self._parking, []
+                    if self._closing:
+                        for request in [*idle, *(p[0] for p in parking)]:
+                            self.shutdown_request(request)
+                        self._selector.close()
+                        self._wakeup.close()
+                        self._waker.close()
+                        return
+                    deadline = time.monotonic() + (timeout or 0)
+                    for request, client_address, handler in parking:
+                        self._selector.register(request, selectors.EVENT_READ)
+                        idle[request] = (client_address, handler, deadline)
+                    continue
+                self._selector.unregister(request)
+                client_address, handler, _ = idle.pop(request)
+                try:
+                    self.pool.submit(self._serve, request, client_address,
+                                     handler)
+                except RuntimeError:
+                    # The pool was shut down
+                    self.shutdown_request(request)
+            if timeout is not None:
+                now = time.monotonic()
+                while idle:
+                    request, (_, _, deadline) = next(iter(idle.items()))
+                    if deadline > now:
+                        break
+                    del idle[request]
+                    self._selector.unregister(request)
+                    self.shutdown_request(request)
+
+    def server_close(self):
+        """Closes the socket and idle connections, and drops queued ones."""
+        super().server_close()
+        self._closing = True
+        self._waker.send(b'\0')
+        self._watcher.join()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- asyncio Server ---
+
+
+async def handle_connection(reader, writer, timeout=5):
+    """Serves the requests of one keep-alive connection."""
+    try:
+        while True:
+            request_line = await asyncio.wait_for(reader.readline(), timeout)
+            if not request_line.strip():
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip().lower()
+            try:
+                method, path, version = request_line.decode('latin-1').split()
+            except ValueError:
+                method = None
+            try:
+                length = int(headers.get('content-length', 0))
+            except ValueError:
+                length = -1
+            if method is None or length < 0:
+                # Where the body ends is unknown, so the connection cannot
+                # be reused either
+                writer.write(BAD_REQUEST.wire(close=True))
+                await writer.drain()
+                break
+
+            body = await reader.readexactly(length) if length else b''
+            response = router.dispatch(method, path, body)
+            connection = headers.get('connection', '')
+            keep_alive = (connection != 'close' if version == 'HTTP/1.1'
+                          else connection == 'keep-alive')
+
+            writer.write(response.wire(method == 'HEAD', not keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError,
+            asyncio.TimeoutError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_async(host='localhost', port=8000):
+    """Serves the API with asyncio until cancelled."""
+    server = await asyncio.start_server(handle_connection, host, port,
+                                        backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'thread'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    if mode not in ('thread', 'async'):
+        sys.exit(f"Unknown mode {mode!r}; use 'thread' or 'async'.")
+    try:
+        if mode == 'async':
+            asyncio.run(serve_async('localhost', port))
         else:
-            self.send_response(404)
-            self.send_header('Content-Type', 'text')
-            self.end_headers()
-            self.wfile.write(b'Endpoint not found')
-server = http.server.HTTPServer(('localhost', 8000), MyHandler)
-server.serve_forever()
+            server = PooledHTTPServer(('localhost', port), MyHandler, workers)
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -3,19 +3,26 @@
 A simple RESTful API developed using the Flask framework.
 It handles user data in memory and supports GET and POST requests.
 """
-from flask import Flask, jsonify, request, abort
+from flask import Flask, jsonify, request
+import itertools
+import json
+import os
+from user_store import UserStore
 
 # Instantiate the Flask application
 app = Flask(__name__)
 
 # In-memory user data store
 # NOTE: Do not include testing data when pushing your code to avoid checker issues.
-users = {}
+# The store is sharded with a lock per shard, so concurrent requests can
+# add users safely; set USER_STORE_DIR to keep the users across restarts.
+users = UserStore(directory=os.environ.get('USER_STORE_DIR'))
 
-# Pre-populate with a single user for initial testing purposes,
-# but remove this line before final submission if the instructions say so.
-# We will initialize it with an empty dictionary as requested to avoid checker issues.
-users = {}
+# Largest page of usernames /data returns at once
+MAX_PAGE_SIZE = 1000
+
+# Users /add_users validates and adds at once
+BATCH_SIZE = 1000
 
 @app.route('/', methods=['GET'])
 def home():
@@ -32,9 +39,56 @@ def get_status():
 # 2. /data
 @app.route('/data', methods=['GET'])
 def get_data():
-    """Returns a JSON list of all usernames."""
-    # Get all keys (usernames) from the dictionary
-    return jsonify(list(users.keys()))
+    """
+    Returns a JSON list of all usernames.
+
+    With 'after' or 'limit', returns one page of usernames in sorted order
+    instead, as {"users": [...], "next": cursor}; passing the cursor as
+    'after' gets the next page, and it is null on the last page.
+
+    With 'format=ndjson', streams the usernames in sorted order, one JSON
+    string per line, starting after 'after' and stopping after 'limit'
+    usernames if given.
+    """
+    after = request.args.get('after')
+    limit_str = request.args.get('limit')
+    ndjson = request.args.get('format') == 'ndjson'
+    if after is None and limit_str is None and not ndjson:
+        # Get all keys (usernames) from the dictionary
+        return jsonify(list(users.keys()))
+
+    limit = None
+    if limit_str is not None:
+        try:
+            limit = int(limit_str)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    if ndjson:
+        def generate():
+            # The store is read a page at a time, and each page is sent as
+            # one chunk
+            cursor, remaining = after, limit
+            while remaining != 0:
+                size = MAX_PAGE_SIZE
+                if remaining is not None:
+                    size = min(size, remaining)
+                    remaining -= size
+                page = users.sorted_keys(cursor, size)
+                if page:
+                    yield ''.join(json.dumps(name) + '\n' for name in page)
+                if len(page) < size:
+                    break
+                cursor = str(page[-1])
+        return app.response_class(generate(), mimetype='application/x-ndjson')
+
+    limit = min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+    # One more than the page, to know whether another page follows
+    page = users.sorted_keys(after, limit + 1)
+    next_after = str(page[limit - 1]) if len(page) > limit else None
+    return jsonify({"users": page[:limit], "next": next_after})
 
 # 3. /users/<username>
 @app.route('/users/<username>', methods=['GET'])
@@ -47,6 +101,31 @@ def get_user(username):
     # Return 404 Not Found error if user does not exist
     return jsonify({"error": "User not found"}), 404
 
+def build_user(data):
+    """
+    Validates the JSON data of a new user.
+
+    Returns:
+        tuple: (user object to store, None), or (None, error message).
+    """
+    if not data or not isinstance(data, dict):
+        # Fallback for non-JSON content, empty body or non-object JSON
+        return None, "Invalid JSON"
+
+    username = data.get('username')
+    if not username:
+        return None, "Username is required"
+    if not isinstance(username, str):
+        return None, "Username must be a string"
+
+    # Ensure the stored user object includes the username key (as per example output)
+    return {
+        "username": username,
+        "name": data.get("name"),
+        "age": data.get("age"),
+        "city": data.get("city")
+    }, None
+
 # 4. /add_user (POST)
 @app.route('/add_user', methods=['POST'])
 def add_user():
@@ -61,38 +140,104 @@ def add_user():
         # 400 Bad Request for invalid JSON
         return jsonify({"error": "Invalid JSON"}), 400
 
-    if not data:
-        # Fallback for non-JSON content or empty body
-        return jsonify({"error": "Invalid JSON"}), 400
-
-    # 2. Check for missing 'username'
-    username = data.get('username')
-    if not username:
-        # 400 Bad Request for missing username
-        return jsonify({"error": "Username is required"}), 400
+    # 2. Validate it, including the required 'username'
+    new_user, error = build_user(data)
+    if error:
+        # 400 Bad Request for invalid JSON or missing username
+        return jsonify({"error": error}), 400
 
-    # 3. Check for existing 'username'
-    if username in users:
+    # 3. Add new user to the store, unless the 'username' exists
+    # The check and the insert are one atomic operation, so two concurrent
+    # requests for the same username cannot both succeed
+    if not users.add_if_absent(new_user["username"], new_user):
         # 409 Conflict for duplicate username
         return jsonify({"error": "Username already exists"}), 409
 
-    # 4. Add new user to the dictionary
-    # Ensure the stored user object includes the username key (as per example output)
-    new_user = {
-        "username": username,
-        "name": data.get("name"),
-        "age": data.get("age"),
-        "city": data.get("city")
-    }
-    
-    users[username] = new_user
-
-    # 5. Return confirmation message (201 Created)
+    # 4. Return confirmation message (201 Created)
     return jsonify({
         "message": "User added",
         "user": new_user
     }), 201
 
+def read_lines(stream, chunk_size=65536):
+    """
+    Yields the lines of a stream, read chunk_size bytes at a time (much
+    faster than reading it line by line).
+    """
+    rest = b''
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        yield from lines
+    yield rest
+
+def parse_line(line):
+    """Returns the JSON value of an NDJSON line, or None if it is invalid."""
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+def add_batch(batch):
+    """
+    Validates a batch of user data and adds the valid users with a single
+    store operation.
+
+    Returns:
+        list: The result of each item, in order.
+    """
+    built = [build_user(data) for data in batch]
+    added = iter(users.add_many([(user["username"], user)
+                                 for user, error in built if error is None]))
+    results = []
+    for user, error in built:
+        if error:
+            results.append({"status": 400, "error": error})
+        elif next(added):
+            results.append({"status": 201, "user": user})
+        else:
+            results.append({"status": 409, "error": "Username already exists"})
+    return results
+
+# 5. /add_users (POST)
+@app.route('/add_users', methods=['POST'])
+def add_users():
+    """
+    Handles POST requests to add many users at once.
+
+    The body is a JSON array of user objects or, with the content type
+    application/x-ndjson, one user object per line. Users are validated and
+    added BATCH_SIZE at a time, each batch with a single store operation,
+    and NDJSON bodies are read a batch at a time.
+
+    Returns one result per user, in order: {"status": 201, "user": ...} or
+    {"status": 400 or 409, "error": ...}. They are returned as
+    {"results": [...]} for a JSON array, and one per line for NDJSON.
+    """
+    ndjson = request.mimetype == 'application/x-ndjson'
+    if ndjson:
+        items = (parse_line(line) for line in read_lines(request.stream)
+                 if line.strip())
+    else:
+        try:
+            data = request.get_json()
+        except Exception:
+            data = None
+        if not isinstance(data, list):
+            # 400 Bad Request if the body is not a JSON array
+            return jsonify({"error": "Expected a JSON array of users"}), 400
+        items = iter(data)
+
+    results = []
+    for batch in iter(lambda: list(itertools.islice(items, BATCH_SIZE)), []):
+        results += add_batch(batch)
+
+    if ndjson:
+        return app.response_class(
+            ''.join(json.dumps(result) + '\n' for result in results),
+            mimetype='application/x-ndjson')
+    return jsonify({"results": results})
+
 # --- Running the Server ---
 if __name__ == '__main__':
     # Running the application on the default host and port (127.0.0.1:5000)
@@ -0,0 +1,406 @@
+#!/usr/bin/python3
+"""
+A thread-safe, sharded in-memory user store with optional persistence,
+used by the Flask API in task_04_flask.
+"""
+import bisect
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import tempfile
+import threading
+import zlib
+from collections.abc import MutableMapping
+
+
+class _Shard:
+    """One stripe of the store: its entries, its lock and its log."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (sequence number, value), in insertion order
+        self.data = {}
+        self.names = _SortedKeys()
+        self.log = None
+        self.logged = 0
+
+
+class _SortedKeys:
+    """
+    Keys sorted by their string form.
+
+    The keys are kept in consecutive blocks of at most _BLOCK keys, with
+    the largest of each block in a separate list, so adding or removing a
+    key moves the keys of one block only, however many there are.
+    """
+    _BLOCK = 1000
+
+    def __init__(self, keys=()):
+        keys = sorted(keys, key=str)
+        # Blocks start half full, leaving room to grow before splitting
+        half = self._BLOCK // 2
+        self._blocks = [keys[i:i + half] for i in range(0, len(keys), half)]
+        self._maxes = [str(block[-1]) for block in self._blocks]
+
+    def add(self, key):
+        """Adds a key, after those with the same string form."""
+        name = str(key)
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(name)
+            return
+        i = min(bisect.bisect_right(self._maxes, name), len(self._blocks) - 1)
+        block = self._blocks[i]
+        bisect.insort_right(block, key, key=str)
+        self._maxes[i] = str(block[-1])
+        if len(block) > self._BLOCK:
+            half = len(block) // 2
+            self._blocks[i:i + 1] = [block[:half], block[half:]]
+            self._maxes[i:i + 1] = [str(block[half - 1]), str(block[-1])]
+
+    def remove(self, key):
+        """Removes a key that is present."""
+        name = str(key)
+        i = bisect.bisect_left(self._maxes, name)
+        j = bisect.bisect_left(self._blocks[i], name, key=str)
+        # Keys with the same string form may span blocks
+        while True:
+            block = self._blocks[i]
+            while j < len(block) and block[j] != key:
+                j += 1
+            if j < len(block):
+                break
+            i, j = i + 1, 0
+        del block[j]
+        if block:
+            self._maxes[i] = str(block[-1])
+        else:
+            del self._blocks[i], self._maxes[i]
+
+    def after(self, name=None, limit=None):
+        """
+        Returns up to limit keys, in order, whose string form sorts after
+        name (all keys if name is None).
+        """
+        i = j = 0
+        if name is not None:
+            i = bisect.bisect_right(self._maxes, name)
+            if i < len(self._blocks):
+                j = bisect.bisect_right(self._blocks[i], name, key=str)
+        keys = []
+        while i < len(self._blocks) and (limit is None or len(keys) < limit):
+            keys += self._blocks[i][j:]
+            i, j = i + 1, 0
+        return keys[:limit]
+
+
+class UserStore(MutableMapping):
+    """
+    A dict-like store of users, split into shards that each have their
+    own lock, so that threads working on different users rarely wait for
+    one another and no operation takes a global lock.
+
+    Iteration follows insertion order across all shards, like a dict: each
+    entry carries a global sequence number, and the shards, each already in
+    that order, are merged. Each shard also keeps its keys sorted by their
+    string form, so sorted_keys() can page through all keys from any point
+    with binary searches in each shard.
+
+    With a directory, every change is appended to its shard's log
+    ('shard-NNN.log', JSON Lines) and the store is reloaded from there on
+    startup. Once a log holds snapshot_every entries, the shard is written
+    to 'shard-NNN.snap' and its log is emptied, so reloading does not
+    replay the whole history.
+    """
+
+    def __init__(self, shards=16, directory=None, snapshot_every=100000,
+                 fsync=False):
+        """
+        Initializes the store, loading it from directory if given.
+
+        Args:
+            shards (int): The number of shards (and locks).
+            directory (str): Where logs and snapshots are kept; None keeps
+                             the store in memory only.
+            snapshot_every (int): Log entries after which a shard is
+                                  snapshotted.
+            fsync (bool): Whether every log append is fsync'ed, rather
+                          than only handed to the operating system.
+
+        Raises:
+            ValueError: If directory was created with another number of
+                        shards, or holds a corrupt record.
+        """
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._shards = [_Shard() for _ in range(shards)]
+        self._sequence = itertools.count()
+        if directory is not None:
+            self._open(directory)
+
+    # --- Persistence ---
+
+    def _path(self, index, suffix):
+        return os.path.join(self.directory, f"shard-{index:03d}.{suffix}")
+
+    def _open(self, directory):
+        """Loads every shard from its snapshot and log, and opens the logs."""
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, 'store.json')
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                shards = json.load(f)['shards']
+        except FileNotFoundError:
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'shards': len(self._shards)}, f)
+            shards = len(self._shards)
+        if shards != len(self._shards):
+            raise ValueError(
+                f"{directory} holds a store of {shards} shards, "
+                f"not {len(self._shards)}")
+
+        last = -1
+        for index, shard in enumerate(self._shards):
+            self._replay(shard, self._path(index, 'snap'))
+            shard.logged, end = self._replay(shard, self._path(index, 'log'))
+            if shard.data:
+                last = max(last, max(seq for seq, _ in shard.data.values()))
+            # Unbuffered: each append is a single write, and one that fails
+            # leaves no bytes behind to be flushed later
+            shard.log = open(self._path(index, 'log'), 'ab', buffering=0)
+            # Drop an incomplete last line so new records start on a line
+            # of their own
+            shard.log.truncate(end)
+        self._sequence = itertools.count(last + 1)
+
+    @staticmethod
+    def _replay(shard, path):
+        """
+        Applies the records of a snapshot or log file to a shard and
+        returns (number of records, end of the last one).
+
+        An incomplete last line (a write cut short by a crash) is ignored,
+        but any other line that is not valid JSON raises ValueError.
+        """
+        count = end = 0
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return 0, 0
+        with f:
+            for number, line in enumerate(f, 1):
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    raise ValueError(
+                        f"{path}: line {number} is corrupt") from None
+                end += len(line)
+                if len(record) == 3:
+                    key, value, seq = record
+                    previous = shard.data.get(key)
+                    shard.data[key] = (previous[0] if previous else seq, value)
+                else:
+                    shard.data.pop(record[0], None)
+                count += 1
+        # Entries must stay in sequence order for iteration
+        if any(a[0] > b[0] for a, b in
+               zip(shard.data.values(), itertools.islice(
+                   shard.data.values(), 1, None))):
+            shard.data = dict(sorted(shard.data.items(),
+                                     key=lambda item: item[1][0]))
+        shard.names = _SortedKeys(shard.data)
+        return count, end
+
+    def _append(self, index, shard, *records):
+        """
+        Logs changes of a shard, in one write; called with the shard's lock
+        held.
+        """
+        if shard.log is None or not records:
+            return
+        data = memoryview(b''.join(json.dumps(record).encode('utf-8') + b'\n'
+                                   for record in records))
+        size = shard.log.seek(0, os.SEEK_END)
+        try:
+            while data:
+                data = data[shard.log.write(data):]
+            if self.fsync:
+                os.fsync(shard.log.fileno())
+        except BaseException:
+            # Cut off what was written, so that the log ends with its last
+            # complete record and the next ones start on a line of their own
+            shard.log.truncate(size)
+            raise
+        shard.logged += len(records)
+        if shard.logged >= self.snapshot_every:
+            self._snapshot(index, shard)
+
+    def _snapshot(self, index, shard):
+        """
+        Writes a shard's entries to its snapshot and empties its log;
+        called with the shard's lock held.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for key, (seq, value) in shard.data.items():
+                    f.write(json.dumps([key, value, seq]).encode('utf-8'))
+                    f.write(b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._path(index, 'snap'))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        # Replaying the log over the new snapshot would give the same
+        # entries, so a crash before this truncation loses nothing
+        shard.log.truncate(0)
+        shard.logged = 0
+
+    def snapshot(self):
+        """Snapshots every shard of a persistent store."""
+        if self.directory is None:
+            return
+        for index, shard in enumerate(self._shards):
+            with shard.lock:
+                self._snapshot(index, shard)
+
+    def close(self):
+        """Closes the logs of a persistent store."""
+        for shard in self._shards:
+            with shard.lock:
+                if shard.log is not None:
+                    shard.log.close()
+                    shard.log = None
+
+    # --- Mapping Interface ---
+
+    def _locate(self, key):
+        """Returns (index, shard) of the shard holding key."""
+        index = zlib.crc32(str(key).encode('utf-8')) % len(self._shards)
+        return index, self._shards[index]
+
+    def add_if_absent(self, key, value):
+        """
+        Atomically adds key unless it is already present.
+
+        Returns:
+            bool: True if the value was added, False if key already existed.
+        """
+        index, shard = self._locate(key)
+        with shard.lock:
+            if key in shard.data:
+                return False
+            seq = next(self._sequence)
+            shard.data[key] = (seq, value)
+            shard.names.add(key)
+            self._append(index, shard, [key, value, seq])
+            return True
+
+    def add_many(self, items):
+        """
+        Atomically adds each (key, value) of items whose key is neither
+        already present nor earlier in items.
+
+        The shards of the keys are locked together (in a fixed order, so
+        that concurrent batches cannot deadlock) for the whole batch, which
+        is added in the order given, and the log records of each shard are
+        written at once.
+
+        Returns:
+            list: For each item, True if it was added, False if its key
+                  already existed.
+        """
+        located = [self._locate(key) for key, _ in items]
+        records = {index: [] for index in sorted({i for i, _ in located})}
+        added = []
+        with contextlib.ExitStack() as stack:
+            for index in records:
+                stack.enter_context(self._shards[index].lock)
+            for (key, value), (index, shard) in zip(items, located):
+                if key in shard.data:
+                    added.append(False)
+                    continue
+                seq = next(self._sequence)
+                shard.data[key] = (seq, value)
+                shard.names.add(key)
+                records[index].append([key, value, seq])
+                added.append(True)
+            for index, shard_records in records.items():
+                self._append(index, self._shards[index], *shard_records)
+        return added
+
+    def __getitem__(self, key):
+        _, shard = self._locate(key)
+        with shard.lock:
+            return shard.data[key][1]
+
+    def get(self, key, default=None):
+        _, shard = self._locate(key)
+        with shard.lock:
+            entry = shard.data.get(key)
+        return default if entry is None else entry[1]
+
+    def __contains__(self, key):
+        _, shard = self._locate(key)
+        with shard.lock:
+            return key in shard.data
+
+    def __setitem__(self, key, value):
+        index, shard = self._locate(key)
+        with shard.lock:
+            previous = shard.data.get(key)
+            if previous:
+                seq = previous[0]
+            else:
+                seq = next(self._sequence)
+                shard.names.add(key)
+            shard.data[key] = (seq, value)
+            self._append(index, shard, [key, value, seq])
+
+    def __delitem__(self, key):
+        index, shard = self._locate(key)
+        with shard.lock:
+            del shard.data[key]
+            shard.names.remove(key)
+            self._append(index, shard, [key])
+
+    def __len__(self):
+        return sum(len(shard.data) for shard in self._shards)
+
+    def __iter__(self):
+        """Yields the keys in insertion order, as of when called."""
+        runs = []
+        for shard in self._shards:
+            with shard.lock:
+                runs.append([(seq, key)
+                             for key, (seq, _) in shard.data.items()])
+        for _, key in heapq.merge(*runs):
+            yield key
+
+    def sorted_keys(self, after=None, limit=None):
+        """
+        Returns keys in the order of their string form.
+
+        Only limit keys at most are taken from each shard before merging,
+        so a page costs the same wherever it starts in the store.
+
+        Args:
+            after (str): Only keys whose string form sorts after this are
+                         returned (a cursor: the last key of a page).
+            limit (int): The maximum number of keys to return.
+
+        Returns:
+            list: The keys.
+        """
+        runs = []
+        for shard in self._shards:
+            with shard.lock:
+                runs.append(shard.names.after(after, limit))
+        return list(itertools.islice(heapq.merge(*runs, key=str), limit))
+